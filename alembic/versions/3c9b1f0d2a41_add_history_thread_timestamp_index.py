@@ -0,0 +1,28 @@
+"""Add composite index on history (thread_id, timestamp, id)
+
+Revision ID: 3c9b1f0d2a41
+Revises: e38d43207fcd
+Create Date: 2026-10-18 17:05:12.418733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9b1f0d2a41'
+down_revision: Union[str, Sequence[str], None] = 'e38d43207fcd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_history_thread_id_timestamp_id', 'history', ['thread_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_history_thread_id_timestamp_id', table_name='history')
@@ -0,0 +1,35 @@
+"""Add thread_summaries table
+
+Revision ID: 8d2e4a7c5b13
+Revises: 3c9b1f0d2a41
+Create Date: 2026-10-18 18:42:37.105262
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4a7c5b13'
+down_revision: Union[str, Sequence[str], None] = '3c9b1f0d2a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('thread_summaries',
+    sa.Column('thread_id', sa.Integer(), nullable=False),
+    sa.Column('summary', sa.String(), nullable=True),
+    sa.Column('summarized_turns', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['thread_id'], ['threads.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('thread_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('thread_summaries')
@@ -0,0 +1,37 @@
+"""Add cache_entries table
+
+Revision ID: b7f3c2e9d4a8
+Revises: 8d2e4a7c5b13
+Create Date: 2026-10-18 21:14:05.662190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3c2e9d4a8'
+down_revision: Union[str, Sequence[str], None] = '8d2e4a7c5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_entries',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('value', sa.LargeBinary(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('lock_owner', sa.String(), nullable=True),
+    sa.Column('lock_expires_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cache_entries')
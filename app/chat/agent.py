@@ -0,0 +1,180 @@
+import importlib
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from app.chat.memory import HISTORY_TOKEN_CEILING, MEMORY_MODE, fit_history, split_turns
+from app.chat.tools import _initialize_tools
+from app.core.metrics import record_span
+
+
+load_dotenv()
+
+
+GENAI_API_KEY = os.getenv("GENAI_API_KEY")
+GENAI_MODEL = os.getenv("GENAI_MODEL", "gemini-2.5-flash")
+# "module:callable" returning the chat model to use instead of Gemini, e.g.
+# benchmarks.fake_llm:create_llm for offline load tests.
+LLM_FACTORY = os.getenv("LLM_FACTORY")
+# Previous user turns sent to the model in addition to the current one (MEMORY_MODE=window).
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "10"))
+
+SYSTEM_PROMPT = """
+    You are ChatBet, an AI assistant that helps users manage their bets and provides information about sports events.
+    The user's name is {name}.
+    The user's favorite sport is {favorite_sport}.
+    Use the tools below to get information about sports events and manage bets.
+    Be proactive in offering help with betting management.
+    When giving details about a bet, consider all possibilities of betting odds and suggest the best option.
+    Not only focus on 1x2 odds, but also consider other odds that might be more advantageous for the user.
+    The odds are:  both_teams_to_score, double_chance, over_under, handicap, half_time_total, half_time_result, etc
+    If you don't know the answer to a question, you should ask the user for more information.
+    Take into account today's date when providing information about sports events.
+    If fixtures or odds are marked as stale, tell the user they come from an earlier check and may have changed.
+    If the odds come as low_risk, medium_risk and high_risk candidates, base the options on them; their probabilities are already computed.
+    Current date: {current_date}
+    Examples of interactions:
+    User: "Which team has the best odds tomorrow?"
+    ChatBet: (uses tool to check_odd_by_dates)
+    ChatBet: The term "best odds" can mean two different things:
+
+    The Highest Potential Payout: The biggest number, which represents the riskiest bet but offers the largest reward.
+
+    The Most Likely Outcome: The smallest number, which represents the safest bet with the highest probability of happening, but offers the smallest reward.
+    Let's break it down based on the data we found for tomorrow:
+
+    ...
+    User: Give me a recommendation for Sunday
+    ChatBet: (uses tool to check_odd_by_date)
+    ChatBet: Based on the fixtures and odds available for Sunday, here are some recommendations based on risk levels:
+    1. Conservative Option: (details of low-risk bets)
+    2. Moderate Value Option: (details of medium-risk bets)
+    3. Risky Option -Higher Payout: (details of high-risk bets)
+    """
+
+SUMMARY_SECTION = """
+    Summary of the earlier conversation with the user:
+    {summary}
+    """
+
+_agent_executor = None
+
+
+class StageTimingHandler(BaseCallbackHandler):
+    """Records every model call and tool call of a run as a request stage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = ("llm", time.perf_counter())
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name", "unknown")
+        self._started[run_id] = (f"tool.{name}", time.perf_counter())
+
+    def _finish(self, run_id) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            stage, at = started
+            record_span(stage, time.perf_counter() - at)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+def _recent_turns(messages: list, max_turns: int) -> list:
+    """Keep the messages from the last `max_turns` user turns plus the current one."""
+    human_positions = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    if len(human_positions) <= max_turns + 1:
+        return messages
+    return messages[human_positions[-(max_turns + 1)]:]
+
+
+def _build_prompt(state, config: RunnableConfig):
+    """Render the system prompt from the per-request values passed in the graph config."""
+    configurable = config.get("configurable", {})
+    system_prompt = SYSTEM_PROMPT.format(
+        name=configurable.get("user_name"),
+        favorite_sport=configurable.get("favorite_sport"),
+        current_date=configurable.get("current_date") or datetime.now().strftime('%A, %Y-%m-%d'),
+    )
+
+    if MEMORY_MODE == "summary":
+        # The summary covers the first summarized_turns turns of the checkpoint; the
+        # current turn is always kept, even if the checkpoint was reset meanwhile.
+        turns = split_turns(state["messages"])
+        turns = turns[min(configurable.get("summarized_turns", 0), len(turns) - 1):]
+    else:
+        turns = split_turns(_recent_turns(state["messages"], HISTORY_MAX_TURNS))
+
+    summary = configurable.get("conversation_summary")
+    summary_section = SUMMARY_SECTION.format(summary=summary) if summary else ""
+    # The summary shares the history token ceiling with the replayed turns.
+    turns = fit_history(turns, HISTORY_TOKEN_CEILING,
+                        reserved=count_tokens_approximately([SystemMessage(content=summary_section)]) if summary else 0)
+    system_message = SystemMessage(content=system_prompt + summary_section)
+    return [system_message, *(message for turn in turns for message in turn)]
+
+
+def agent_config(thread_id: int, user_name: str | None, favorite_sport: str | None,
+                 summary: str | None = None, summarized_turns: int = 0) -> dict:
+    return {
+        "configurable": {
+            "thread_id": f"thread_{thread_id}",
+            "user_name": user_name,
+            "favorite_sport": favorite_sport,
+            "current_date": datetime.now().strftime('%A, %Y-%m-%d'),
+            "conversation_summary": summary,
+            "summarized_turns": summarized_turns,
+        },
+        "callbacks": [StageTimingHandler()],
+    }
+
+
+def build_llm(model: str = GENAI_MODEL):
+    if LLM_FACTORY:
+        module_name, _, factory = LLM_FACTORY.partition(":")
+        return getattr(importlib.import_module(module_name), factory)(model=model)
+    return ChatGoogleGenerativeAI(model=model, google_api_key=GENAI_API_KEY)
+
+
+async def build_agent(checkpointer=None):
+    """Create the model client, tools and compiled ReAct graph. Called once at startup."""
+    global _agent_executor
+
+    llm = build_llm()
+    tools = await _initialize_tools()
+
+    _agent_executor = create_react_agent(
+        model=llm,
+        tools=tools,
+        prompt=RunnableLambda(_build_prompt),
+        checkpointer=checkpointer or MemorySaver(),
+    )
+    return _agent_executor
+
+
+async def get_agent():
+    if _agent_executor is None:
+        await build_agent()
+    return _agent_executor
@@ -0,0 +1,66 @@
+import os
+import re
+from typing import Awaitable, Callable
+from dotenv import load_dotenv
+
+from app.chat.context import UserContext
+from app.chat.tools import snapshot_fingerprint
+from app.core.cache import TTLCache
+from app.core.metrics import register_cache
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "120"))
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", "2000"))
+
+# Keyed by (normalized query, sport_id, date, snapshot fingerprint); values are
+# (answer, shareable) where answers mentioning the asking user's name are not shareable.
+answer_cache = register_cache("answers", TTLCache(ttl=ANSWER_CACHE_TTL, maxsize=ANSWER_CACHE_MAXSIZE))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", query.casefold()).split())
+
+
+def answer_key(query: str, sport_id: int | None, current_date: str) -> tuple:
+    return normalize_query(query), sport_id, current_date, snapshot_fingerprint(sport_id)
+
+
+def _shareable(answer: str, name: str | None) -> bool:
+    """Whether the answer can go to other users: it must not mention the asker's name anywhere."""
+    return not name or name.casefold() not in answer.casefold()
+
+
+async def get_or_answer(query: str, user_context: UserContext, current_date: str,
+                        answer: Callable[[], Awaitable[str]]) -> tuple[str, bool]:
+    """Return (answer, hit), calling `answer` only when no equivalent question was answered on the same data.
+
+    Only answers that do not mention the asking user are shared, and identical
+    questions asked concurrently share one call. Callers only use this for turns
+    that do not depend on earlier messages of the thread.
+    """
+    key = answer_key(query, user_context.sport_id, current_date)
+    answered = False
+
+    async def load():
+        nonlocal answered
+        answered = True
+        text = await answer()
+        return text, _shareable(text, user_context.name)
+
+    cached, shareable = await answer_cache.get_or_load(key, load)
+    if answered:
+        if not shareable:
+            answer_cache.pop(key)
+        else:
+            # The run itself may have downloaded fresh data; store under the new fingerprint too
+            # so the next identical question hits.
+            fresh_key = answer_key(query, user_context.sport_id, current_date)
+            if fresh_key != key:
+                answer_cache.set(fresh_key, (cached, shareable))
+        return cached, False
+    if not shareable:
+        # Shared an in-flight run whose answer was personal to another user.
+        return await answer(), False
+    return cached, True
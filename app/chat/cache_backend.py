@@ -0,0 +1,405 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Hashable
+
+import orjson
+from dotenv import load_dotenv
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.cache import TTLCache
+from app.core.resilience import DeadlineExceeded, remaining_time, remaining_timeout
+
+load_dotenv()
+
+# "memory" keeps shared entries in this process; "database" shares them between
+# workers through the cache_entries table of the application database.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+# Seconds a worker may hold the refresh lock of a key before others take over.
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "30"))
+# Seconds a worker waits for another one's refresh before loading the key itself.
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", "10"))
+# Forced refreshes (prefetch) skip entries another worker stored within this fraction of the TTL.
+CACHE_REFRESH_FRACTION = float(os.getenv("CACHE_REFRESH_FRACTION", "0.5"))
+# Expired entries are kept this many seconds for stale fallbacks, then purged every CACHE_PURGE_INTERVAL.
+CACHE_RETENTION = float(os.getenv("CACHE_RETENTION", "3600"))
+CACHE_PURGE_INTERVAL = float(os.getenv("CACHE_PURGE_INTERVAL", "300"))
+
+# Backend failures after which SharedCache calls the loader directly.
+BACKEND_ERRORS = (SQLAlchemyError, OSError)
+
+_LOCK_POLL = 0.05
+_PROCESS = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: Any
+    # Incremented on every store of the key, so readers can tell snapshots apart.
+    version: int
+    updated_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+
+class CacheBackend(ABC):
+    """Storage shared by every SharedCache; subclasses decide how far it is shared."""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> CacheEntry | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> CacheEntry:
+        ...
+
+    @abstractmethod
+    async def acquire(self, key: str, owner: str, lease: float) -> bool:
+        """Take the refresh lock of `key` unless another owner holds an unexpired one."""
+
+    @abstractmethod
+    async def release(self, key: str, owner: str) -> None:
+        ...
+
+    async def purge(self, retention: float) -> int:
+        """Delete entries expired more than `retention` seconds ago; returns how many."""
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """Entries and locks of this process only."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 20000):
+        # Expired entries are kept until evicted, so callers can still read stale values.
+        self._entries = TTLCache(ttl=float("inf"), maxsize=maxsize)
+        self._locks: dict[str, tuple[str, float]] = {}
+        self._mutex = threading.Lock()
+
+    async def get(self, key: str) -> CacheEntry | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> CacheEntry:
+        now = time.time()
+        with self._mutex:
+            previous = self._entries.get(key)
+            entry = CacheEntry(value, previous.version + 1 if previous else 1, now, now + ttl)
+            self._entries.set(key, entry)
+        return entry
+
+    async def acquire(self, key: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self._mutex:
+            holder = self._locks.get(key)
+            if holder is not None and holder[1] > now:
+                return False
+            self._locks[key] = (owner, now + lease)
+            return True
+
+    async def release(self, key: str, owner: str) -> None:
+        with self._mutex:
+            if self._locks.get(key, (None,))[0] == owner:
+                del self._locks[key]
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(value: datetime | None) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else 0.0
+
+
+class DatabaseBackend(CacheBackend):
+    """Entries in the cache_entries table, shared by every worker on the database.
+
+    Values are stored orjson-encoded, and the refresh lock is a lease kept on the row.
+    """
+
+    name = "database"
+
+    def __init__(self, engine):
+        from app.chat import models
+
+        self.engine = engine
+        self.table = models.CacheEntries.__table__
+
+    def _insert(self):
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(self.table)
+
+    async def get(self, key: str) -> CacheEntry | None:
+        table = self.table
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(
+                select(table.c.value, table.c.version, table.c.updated_at, table.c.expires_at)
+                .where(table.c.key == key)
+            )).first()
+        if row is None or row.value is None:
+            return None
+        return CacheEntry(orjson.loads(row.value), row.version, _to_timestamp(row.updated_at),
+                          _to_timestamp(row.expires_at))
+
+    async def set(self, key: str, value: Any, ttl: float) -> CacheEntry:
+        now = time.time()
+        insert = self._insert()
+        statement = insert.values(
+            key=key, value=orjson.dumps(value), version=1,
+            updated_at=_to_datetime(now), expires_at=_to_datetime(now + ttl),
+        ).on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={
+                "value": insert.excluded.value,
+                "version": self.table.c.version + 1,
+                "updated_at": insert.excluded.updated_at,
+                "expires_at": insert.excluded.expires_at,
+            },
+        ).returning(self.table.c.version)
+        async with self.engine.begin() as conn:
+            version = (await conn.execute(statement)).scalar_one()
+        return CacheEntry(value, version, now, now + ttl)
+
+    async def acquire(self, key: str, owner: str, lease: float) -> bool:
+        now = datetime.utcnow()
+        table = self.table
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                self._insert().values(key=key, version=0).on_conflict_do_nothing(index_elements=[table.c.key])
+            )
+            result = await conn.execute(
+                update(table)
+                .where(table.c.key == key,
+                       or_(table.c.lock_expires_at.is_(None), table.c.lock_expires_at < now))
+                .values(lock_owner=owner, lock_expires_at=_to_datetime(time.time() + lease))
+            )
+        return result.rowcount == 1
+
+    async def release(self, key: str, owner: str) -> None:
+        table = self.table
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(table)
+                .where(table.c.key == key, table.c.lock_owner == owner)
+                .values(lock_owner=None, lock_expires_at=None)
+            )
+
+    async def purge(self, retention: float) -> int:
+        table = self.table
+        now = datetime.utcnow()
+        cutoff = _to_datetime(time.time() - retention)
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                delete(table).where(
+                    or_(table.c.lock_expires_at.is_(None), table.c.lock_expires_at < now),
+                    # Lock placeholders of loads that failed never get a value.
+                    or_(table.c.expires_at < cutoff, and_(table.c.value.is_(None), table.c.expires_at.is_(None))),
+                )
+            )
+        return result.rowcount
+
+
+class CachePurger:
+    """Background task deleting cache entries expired longer than CACHE_RETENTION."""
+
+    def __init__(self, interval: float = CACHE_PURGE_INTERVAL, retention: float = CACHE_RETENTION):
+        self.interval = interval
+        self.retention = retention
+        self.purged = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.purged += await get_cache_backend().purge(self.retention)
+            except BACKEND_ERRORS as e:
+                print(f"[{datetime.now()}] Could not purge cache entries: {e}")
+            await asyncio.sleep(self.interval)
+
+
+cache_purger = CachePurger()
+
+
+_backend: CacheBackend | None = None
+
+
+def get_cache_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        if CACHE_BACKEND == "database":
+            # Imported here so the tools stay usable without a database (benchmarks).
+            from app.database import engine
+            _backend = DatabaseBackend(engine)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+class SharedCache:
+    """Per-process TTLCache in front of a CacheBackend shared between workers.
+
+    Loaders return plain JSON values, which are stored in the backend and turned
+    into the value kept in this process by `build(key, value)`. Only the worker
+    holding a key's refresh lock calls the loader; the others wait for its result.
+    """
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int = 1024,
+                 build: Callable[[Hashable, Any], Any] | None = None,
+                 backend: CacheBackend | None = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.build = build or (lambda key, value: value)
+        self._backend = backend
+        self.shared_hits = 0
+        self.loads = 0
+        self.lock_waits = 0
+        self.backend_errors = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def _shared_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join((self.namespace, *map(str, parts)))
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          refresh: bool = False) -> Any:
+        if self.ttl <= 0:
+            return self.build(key, await loader())
+
+        expires = {}
+        loaded = {}
+
+        async def tracked_loader():
+            loaded["value"] = await loader()
+            return loaded["value"]
+
+        async def load():
+            try:
+                entry = await self._load_shared(key, tracked_loader, refresh)
+            except asyncio.TimeoutError:
+                # An OSError too on 3.11+, but raised by the loader or a deadline, not the backend.
+                raise
+            except BACKEND_ERRORS:
+                # The shared store is down, not the upstream: keep serving from this process.
+                self.backend_errors += 1
+                value = loaded["value"] if "value" in loaded else await loader()
+                now = time.time()
+                entry = CacheEntry(value, 0, now, now + self.ttl)
+            expires["at"] = entry.expires_at
+            return self.build(key, entry.value)
+
+        # Waiting on another caller's load is bounded by this caller's own deadline.
+        value = await self.local.get_or_load(key, load, refresh=refresh, timeout=remaining_timeout())
+        if expires:
+            # Expire the local copy together with the shared entry it came from.
+            self.local.set(key, value, ttl=max(0.0, expires["at"] - time.time()))
+        return value
+
+    async def _load_shared(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                           refresh: bool) -> CacheEntry:
+        backend = self.backend
+        shared_key = self._shared_key(key)
+        entry = await backend.get(shared_key)
+        if entry is not None and entry.fresh and (not refresh or entry.age < self.ttl * CACHE_REFRESH_FRACTION):
+            self.shared_hits += 1
+            return entry
+
+        owner = f"{_PROCESS}:{uuid.uuid4().hex[:12]}"
+        deadline = time.monotonic() + max(0.0, remaining_time(CACHE_LOCK_WAIT))
+        while True:
+            if await backend.acquire(shared_key, owner, CACHE_LOCK_TIMEOUT):
+                try:
+                    return await self._store(backend, shared_key, loader)
+                finally:
+                    await backend.release(shared_key, owner)
+
+            # Another worker is loading this key; take its result once stored.
+            self.lock_waits += 1
+            await asyncio.sleep(_LOCK_POLL)
+            latest = await backend.get(shared_key)
+            if latest is not None and latest.fresh and (entry is None or latest.version != entry.version):
+                self.shared_hits += 1
+                return latest
+            if time.monotonic() >= deadline:
+                if remaining_time(CACHE_LOCK_WAIT) <= 0:
+                    # The caller's budget is spent; it serves a stale entry or fails instead.
+                    raise DeadlineExceeded(f"no time left waiting for {shared_key}")
+                # The holder is slow or gone; load without the lock rather than fail.
+                return await self._store(backend, shared_key, loader)
+
+    async def get_stale(self, key: Hashable) -> tuple[Any, float] | None:
+        """The last stored value of `key` and its age in seconds, even if expired.
+
+        For serving something when the loader fails; the value is not put back in
+        the local cache, so the next lookup tries the loader again.
+        """
+        if self.ttl <= 0:
+            return None
+        try:
+            entry = await self.backend.get(self._shared_key(key))
+        except BACKEND_ERRORS:
+            self.backend_errors += 1
+            return None
+        if entry is None:
+            return None
+        return self.build(key, entry.value), entry.age
+
+    async def _store(self, backend: CacheBackend, shared_key: str,
+                     loader: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        value = await loader()
+        self.loads += 1
+        return await backend.set(shared_key, value, self.ttl)
+
+    def stats(self) -> dict:
+        local = self.local.stats()
+        hits = local["hits"] + self.shared_hits
+        total = hits + self.loads
+        return {
+            "backend": self.backend.name,
+            "size": local["size"],
+            "hits": hits,
+            "misses": self.loads,
+            "hit_ratio": hits / total if total else 0.0,
+            "local_hits": local["hits"],
+            "shared_hits": self.shared_hits,
+            "lock_waits": self.lock_waits,
+            "backend_errors": self.backend_errors,
+        }
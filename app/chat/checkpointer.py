@@ -0,0 +1,41 @@
+import os
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+
+load_dotenv()
+
+
+# Defaults to the application database; a sqlite:/// URL can stand in for tests.
+CHECKPOINT_DATABASE_URL = os.getenv("CHECKPOINT_DATABASE_URL") or os.getenv("DATABASE_URL")
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+
+
+@asynccontextmanager
+async def open_checkpointer(url: str = CHECKPOINT_DATABASE_URL):
+    """Open the durable LangGraph checkpointer for the lifetime of the application."""
+    database_url = make_url(url)
+
+    if database_url.get_backend_name() == "sqlite":
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with AsyncSqliteSaver.from_conn_string(database_url.database or ":memory:") as checkpointer:
+            await checkpointer.setup()
+            yield checkpointer
+        return
+
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    conninfo = database_url.set(drivername="postgresql").render_as_string(hide_password=False)
+    async with AsyncConnectionPool(
+        conninfo=conninfo,
+        max_size=CHECKPOINT_POOL_SIZE,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    ) as pool:
+        checkpointer = AsyncPostgresSaver(pool)
+        await checkpointer.setup()
+        yield checkpointer
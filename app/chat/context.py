@@ -0,0 +1,19 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class UserContext:
+    """The user and sport a chat turn runs for."""
+    user_id: int | None = None
+    name: str | None = None
+    sport_id: int | None = None
+    favorite_sport: str | None = None
+
+
+# Set once per request; tasks spawned by the agent (tool calls) inherit a copy.
+current_user: ContextVar[UserContext] = ContextVar("current_user", default=UserContext())
+
+
+def get_user_context() -> UserContext:
+    return current_user.get()
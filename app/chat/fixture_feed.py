@@ -0,0 +1,65 @@
+import os
+from typing import Any, AsyncIterator, Dict, Sequence
+
+import httpx
+from dotenv import load_dotenv
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+load_dotenv()
+
+
+def _env_fields(name: str) -> tuple[str, ...] | None:
+    value = os.getenv(name, "").strip()
+    return tuple(field.strip() for field in value.split(",") if field.strip()) or None
+
+
+# Dotted paths kept on every fixture, e.g. "id,startTime,home_team_data.name.en"; unset keeps everything.
+FIXTURE_FIELDS = _env_fields("FIXTURE_FIELDS")
+
+
+def project_fixture(fixture: Dict[str, Any], fields: Sequence[str] | None = FIXTURE_FIELDS) -> Dict[str, Any]:
+    """Copy only the given dotted paths of a fixture, keeping their nesting."""
+    if not fields:
+        return fixture
+
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        *parents, leaf = field.split(".")
+        source, target = fixture, projected
+        for key in parents:
+            source = source.get(key) if isinstance(source, dict) else None
+            if source is None:
+                break
+            target = target.setdefault(key, {})
+        else:
+            if isinstance(source, dict) and leaf in source:
+                target[leaf] = source[leaf]
+    return projected
+
+
+async def iter_fixtures(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the fixtures of a streamed /sports/sports-fixtures body one at a time.
+
+    Only the fixture being parsed is held in memory. Without ijson the body is
+    read and decoded whole.
+    """
+    if ijson is None:
+        await response.aread()
+        for fixture in response.json():
+            yield fixture
+        return
+
+    parsed = ijson.sendable_list()
+    parser = ijson.items_coro(parsed, "item", use_float=True)
+    async for chunk in response.aiter_bytes():
+        parser.send(chunk)
+        for fixture in parsed:
+            yield fixture
+        del parsed[:]
+    parser.close()
+    for fixture in parsed:
+        yield fixture
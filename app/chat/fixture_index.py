@@ -0,0 +1,108 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+
+def normalize_team_name(name: str | None) -> str:
+    return " ".join(name.split()).casefold() if name else ""
+
+
+def get_team_names(fixture: Dict[str, Any]) -> tuple[str | None, str | None]:
+    return (fixture.get("home_team_data", {}).get("name", {}).get("en"),
+            fixture.get("away_team_data", {}).get("name", {}).get("en"))
+
+
+def parse_start_time(str_date_time: str, year: int) -> datetime:
+    date_time = datetime.strptime(str_date_time, "%m-%d %H:%M")
+    return date_time.replace(year=year)
+
+
+def involves_teams(*teams: str) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate matching fixtures where any of the given teams plays."""
+    wanted = {normalize_team_name(team) for team in teams}
+    return lambda fixture: not wanted.isdisjoint(map(normalize_team_name, get_team_names(fixture)))
+
+
+def starts_between(start: datetime, end: datetime) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate matching fixtures starting in [start, end)."""
+    year = datetime.now().year
+
+    def predicate(fixture: Dict[str, Any]) -> bool:
+        try:
+            return start <= parse_start_time(fixture.get("startTime"), year) < end
+        except (TypeError, ValueError):
+            return False
+    return predicate
+
+
+class FixtureIndex:
+    """Lookup structure built once per fixtures feed snapshot.
+
+    Start times are parsed once and kept sorted for bisect range queries, and
+    fixtures are grouped by normalized team name.
+    """
+
+    def __init__(self, fixtures: List[Dict[str, Any]], year: int | None = None, digest: str | None = None):
+        year = year or datetime.now().year
+        self.fixtures = fixtures
+        # Digest of the feed snapshot the index was built from, when it was recorded.
+        self.digest = digest
+        # Age in seconds of a snapshot served after its download failed (see fetch_fixture_index).
+        self.stale_age: float | None = None
+        self._by_id: Dict[str, Dict[str, Any]] | None = None
+
+        timed = []
+        self.by_team: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for position, fixture in enumerate(fixtures):
+            start_time = fixture.get("startTime")
+            if start_time:
+                try:
+                    timed.append((parse_start_time(start_time, year), position))
+                except ValueError:
+                    pass
+            for team in set(map(normalize_team_name, get_team_names(fixture))):
+                if team:
+                    self.by_team[team].append(fixture)
+
+        timed.sort()
+        self.start_times = [start for start, _ in timed]
+        self.by_start_time = [fixtures[position] for _, position in timed]
+
+    def __len__(self) -> int:
+        return len(self.fixtures)
+
+    def marked(self, fixtures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """`fixtures` as handed to the model: copies carrying mark_stale's marker when the index is stale."""
+        if self.stale_age is None:
+            return fixtures
+        marker = {"stale": True, "stale_age_seconds": round(self.stale_age)}
+        return [{**fixture, **marker} for fixture in fixtures]
+
+    def by_team_name(self, team: str) -> List[Dict[str, Any]]:
+        return list(self.by_team.get(normalize_team_name(team), ()))
+
+    def by_teams(self, team_1: str, team_2: str) -> List[Dict[str, Any]]:
+        wanted = {normalize_team_name(team_1), normalize_team_name(team_2)}
+        return [
+            fixture for fixture in self.by_team.get(normalize_team_name(team_1), ())
+            if set(map(normalize_team_name, get_team_names(fixture))) == wanted
+        ]
+
+    def by_ids(self, fixture_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fixtures with the given ids, in the order asked; unknown ids are skipped."""
+        if self._by_id is None:
+            self._by_id = {str(fixture.get("id")): fixture for fixture in self.fixtures}
+        return [self._by_id[fixture_id] for fixture_id in fixture_ids if fixture_id in self._by_id]
+
+    def between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Fixtures starting in the closed interval [start, end]."""
+        lo = bisect_left(self.start_times, start)
+        hi = bisect_right(self.start_times, end)
+        return self.by_start_time[lo:hi]
+
+    def on_date(self, date: datetime) -> List[Dict[str, Any]]:
+        start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        lo = bisect_left(self.start_times, start)
+        hi = bisect_left(self.start_times, start + timedelta(days=1))
+        return self.by_start_time[lo:hi]
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from prometheus_client import Counter
+from sqlalchemy import insert
+
+from app.chat import models
+from app.database import SessionLocal
+
+load_dotenv()
+
+# "sync" commits each exchange on the request path, "batched" queues it for the writer below.
+HISTORY_DURABILITY = os.getenv("HISTORY_DURABILITY", "sync")
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "1000"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+# Extra tries for a batch whose insert failed, with exponential backoff from HISTORY_RETRY_DELAY.
+HISTORY_FLUSH_RETRIES = int(os.getenv("HISTORY_FLUSH_RETRIES", "3"))
+HISTORY_RETRY_DELAY = float(os.getenv("HISTORY_RETRY_DELAY", "0.5"))
+
+HISTORY_ROWS = Counter("chatbet_history_rows_total", "Queued history rows by outcome", ["outcome"])
+
+
+class HistoryWriter:
+    """Write-behind queue that stores chat exchanges with batched multi-row inserts."""
+
+    def __init__(self, maxsize: int = HISTORY_QUEUE_SIZE, batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_interval: float = HISTORY_FLUSH_INTERVAL):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop. Called on shutdown."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, thread_id: int, input_message: str, output_message: str) -> None:
+        # Waits when the queue is full, so a slow database pushes back on requests
+        # instead of growing memory without bound.
+        await self._queue.put({
+            "thread_id": thread_id,
+            "input_message": input_message,
+            "output_message": output_message,
+            "timestamp": datetime.utcnow(),
+        })
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+        # Drain anything enqueued after the stop marker.
+        remaining = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not None:
+                remaining.append(row)
+        if remaining:
+            await self._flush(remaining)
+
+    async def _flush(self, batch: list[dict]) -> None:
+        # New rows wait in the queue meanwhile, so retries also push back on requests.
+        for retry in range(HISTORY_FLUSH_RETRIES + 1):
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(insert(models.History), batch)
+                    await db.commit()
+            except Exception as e:
+                if retry < HISTORY_FLUSH_RETRIES:
+                    HISTORY_ROWS.labels("retried").inc(len(batch))
+                    await asyncio.sleep(HISTORY_RETRY_DELAY * 2 ** retry)
+                    continue
+                self.failed += len(batch)
+                HISTORY_ROWS.labels("dropped").inc(len(batch))
+                print(f"[{datetime.now()}] Dropped {len(batch)} history rows after {retry + 1} tries: {e}")
+                return
+            self.written += len(batch)
+            HISTORY_ROWS.labels("written").inc(len(batch))
+            return
+
+    def stats(self) -> dict:
+        return {
+            "durability": HISTORY_DURABILITY,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+history_writer = HistoryWriter()
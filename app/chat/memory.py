@@ -0,0 +1,215 @@
+import asyncio
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.chat import models
+from app.core.cache import TTLCache
+from app.core.metrics import register_cache
+from app.database import SessionLocal
+
+load_dotenv()
+
+# "window" replays the last HISTORY_MAX_TURNS turns; "summary" sends a rolling
+# summary of older turns plus the turns it does not cover yet.
+MEMORY_MODE = os.getenv("MEMORY_MODE", "window")
+# Turns kept verbatim after the summary.
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "4"))
+# Uncovered turns beyond MEMORY_RECENT_TURNS that trigger a new summary, so the
+# summarizer does not call the model after every turn.
+MEMORY_SUMMARY_BATCH = int(os.getenv("MEMORY_SUMMARY_BATCH", "2"))
+# Model used for summaries; a smaller one than GENAI_MODEL keeps them cheap.
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL") or os.getenv("GENAI_MODEL", "gemini-2.5-flash")
+MEMORY_SUMMARY_MAX_WORDS = int(os.getenv("MEMORY_SUMMARY_MAX_WORDS", "200"))
+MEMORY_SUMMARY_CACHE_TTL = float(os.getenv("MEMORY_SUMMARY_CACHE_TTL", "300"))
+# Approximate tokens of earlier turns (and summary) sent with each request; 0 disables it.
+HISTORY_TOKEN_CEILING = int(os.getenv("HISTORY_TOKEN_CEILING", "8000"))
+
+SUMMARY_PROMPT = """
+    You keep the running summary of a conversation between a user and ChatBet, a sports betting assistant.
+    Merge the new turns into the current summary.
+    Keep the teams, fixtures, dates and markets the user asked about, the recommendations given and anything left open.
+    Leave out full odds listings, they can be fetched again.
+    Reply with the summary only, at most {max_words} words.
+    """
+
+# thread_id -> (summary, summarized_turns)
+summaries = register_cache("summaries", TTLCache(ttl=MEMORY_SUMMARY_CACHE_TTL, maxsize=10000))
+
+
+def message_text(content) -> str:
+    """Text of a message or chunk, whose content may be a string or a list of parts."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+        if isinstance(part, str) or part.get("type") == "text"
+    )
+
+
+def split_turns(messages: list) -> list[list]:
+    """Group messages into turns, each starting at a user message."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact_turn(turn: list) -> list:
+    """User messages and final answers of a turn; tool calls and their results are left out."""
+    return [
+        message for message in turn
+        if isinstance(message, HumanMessage)
+        or (isinstance(message, AIMessage) and not message.tool_calls and message_text(message.content))
+    ]
+
+
+def fit_history(turns: list[list], token_ceiling: int, reserved: int = 0) -> list[list]:
+    """Fit earlier turns in `token_ceiling`; the last (current) turn is always kept whole.
+
+    Earlier turns are first reduced to their questions and answers (see
+    compact_turn), then the oldest are dropped until the rest fit.
+    """
+    if token_ceiling <= 0 or not turns:
+        return turns
+    budget = token_ceiling - reserved
+    kept = []
+    for turn in reversed(turns[:-1]):
+        turn = compact_turn(turn)
+        cost = count_tokens_approximately(turn)
+        if cost > budget:
+            break
+        budget -= cost
+        kept.append(turn)
+    kept.reverse()
+    return [*kept, turns[-1]]
+
+
+def turn_transcript(turn: list) -> str:
+    """User question and final answers of a turn; tool calls and results are left out."""
+    lines = []
+    for message in turn:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message_text(message.content)}")
+        elif isinstance(message, AIMessage) and not message.tool_calls:
+            text = message_text(message.content)
+            if text:
+                lines.append(f"ChatBet: {text}")
+    return "\n".join(lines)
+
+
+async def load_summary(thread_id: int, db: AsyncSession, cached: bool = True) -> tuple[str | None, int]:
+    """The thread's (summary, summarized_turns), (None, 0) before its first summary."""
+    value = summaries.get(thread_id) if cached else None
+    if value is not None:
+        return value
+    row = await db.get(models.ThreadSummaries, thread_id)
+    value = (row.summary, row.summarized_turns) if row else (None, 0)
+    summaries.set(thread_id, value)
+    return value
+
+
+class Summarizer:
+    """Background task that folds older turns of a thread into its stored summary."""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.summarized = 0
+        self.failed = 0
+        self._agent = None
+        self._llm = None
+        self._pending: dict[int, dict] = {}
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, agent_executor, llm) -> None:
+        if self._task is None:
+            self._agent = agent_executor
+            self._llm = llm
+            self._queue = asyncio.Queue(self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, thread_id: int, config: dict) -> None:
+        """Queue a thread after one of its turns was saved. Never waits."""
+        if not self.running or thread_id in self._pending:
+            return
+        try:
+            self._queue.put_nowait(thread_id)
+        except asyncio.QueueFull:
+            # The next turn of the thread schedules it again.
+            return
+        self._pending[thread_id] = config
+
+    async def _run(self) -> None:
+        while True:
+            thread_id = await self._queue.get()
+            config = self._pending.pop(thread_id)
+            try:
+                await self.summarize(thread_id, config)
+            except Exception as e:
+                self.failed += 1
+                print(f"[{datetime.now()}] Could not summarize thread {thread_id}: {e}")
+
+    async def summarize(self, thread_id: int, config: dict) -> bool:
+        """Fold the turns older than MEMORY_RECENT_TURNS into the summary once enough piled up."""
+        snapshot = await self._agent.aget_state(config)
+        turns = split_turns(snapshot.values.get("messages", []))
+
+        async with SessionLocal() as db:
+            summary, summarized_turns = await load_summary(thread_id, db, cached=False)
+        if len(turns) - summarized_turns < MEMORY_RECENT_TURNS + MEMORY_SUMMARY_BATCH:
+            return False
+
+        covered = len(turns) - MEMORY_RECENT_TURNS
+        transcript = "\n\n".join(turn_transcript(turn) for turn in turns[summarized_turns:covered])
+        # No connection is held while the model answers.
+        response = await self._llm.ainvoke([
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=MEMORY_SUMMARY_MAX_WORDS)),
+            HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"),
+        ])
+        summary = message_text(response.content).strip()
+
+        async with SessionLocal() as db:
+            row = await db.get(models.ThreadSummaries, thread_id)
+            if row is None:
+                row = models.ThreadSummaries(thread_id=thread_id)
+                db.add(row)
+            row.summary = summary
+            row.summarized_turns = covered
+            await db.commit()
+
+        summaries.set(thread_id, (summary, covered))
+        self.summarized += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "mode": MEMORY_MODE,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "summarized": self.summarized,
+            "failed": self.failed,
+            "cache": summaries.stats(),
+        }
+
+
+summarizer = Summarizer()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, LargeBinary
 from datetime import datetime
 from sqlalchemy.orm import relationship
 
@@ -30,8 +30,33 @@ class History(Base):
     output_message = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_history_thread_id_timestamp_id", "thread_id", "timestamp", "id"),
+    )
+
 class Sports(Base):
     __tablename__ = "sports"
     
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=True)
\ No newline at end of file
+    name = Column(String, nullable=True)
+
+class ThreadSummaries(Base):
+    __tablename__ = "thread_summaries"
+
+    thread_id = Column(ForeignKey('threads.id', ondelete="CASCADE"), primary_key=True)
+    summary = Column(String, nullable=True)
+    # Number of user turns, from the start of the thread, folded into the summary.
+    summarized_turns = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CacheEntries(Base):
+    __tablename__ = "cache_entries"
+
+    key = Column(String, primary_key=True)
+    # orjson-encoded value; NULL while the first load of the key holds the lock.
+    value = Column(LargeBinary, nullable=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    lock_owner = Column(String, nullable=True)
+    lock_expires_at = Column(DateTime, nullable=True)
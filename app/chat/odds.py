@@ -0,0 +1,215 @@
+import json
+import os
+from typing import Any, Collection, Sequence
+from dotenv import load_dotenv
+
+from app.chat.fixture_index import get_team_names
+
+load_dotenv()
+
+
+# Markets the agent is told to compare, in order of relevance.
+MARKETS = (
+    "1x2",
+    "double_chance",
+    "over_under",
+    "handicap",
+    "both_teams_to_score",
+    "half_time_result",
+    "half_time_total",
+)
+
+
+def _env_list(name: str) -> tuple[str, ...] | None:
+    value = os.getenv(name, "").strip()
+    return tuple(item.strip() for item in value.split(",") if item.strip()) or None
+
+
+# Known markets to keep; unset keeps every market.
+ODDS_MARKETS = _env_list("ODDS_MARKETS")
+# Fields kept on every selection; unset keeps name/odds/betId when profit equals odds.
+ODDS_SELECTION_FIELDS = _env_list("ODDS_SELECTION_FIELDS")
+
+_SHORT_SELECTION_FIELDS = ("name", "odds", "betId")
+
+# "json" returns the condensed payloads; "table" returns encode_odds_table output;
+# "analytics" returns the risk-ranked candidates of odds_analytics.analyze_odds.
+ODDS_OUTPUT_FORMAT = os.getenv("ODDS_OUTPUT_FORMAT", "json")
+ODDS_TOKEN_BUDGET = int(os.getenv("ODDS_TOKEN_BUDGET", "4000"))
+
+
+def condense_betting_json(data: Any,
+                          markets: Collection[str] | None = ODDS_MARKETS,
+                          fields: Sequence[str] | None = ODDS_SELECTION_FIELDS) -> Any:
+    """
+    Condense betting JSON by removing null values and redundant structures.
+
+    Works in a single pass without building an intermediate cleaned tree.
+    `markets` drops the known markets (see MARKETS) that are not listed, and
+    `fields` projects every selection onto the given keys.
+    """
+    excluded = frozenset(MARKETS).difference(markets) if markets else frozenset()
+    if isinstance(data, dict):
+        return _condense_dict(data, True, excluded, fields)
+    if isinstance(data, list):
+        return _condense_list(data, excluded, fields)
+    return data
+
+
+def _condense_dict(obj: dict, simplify: bool, excluded: frozenset, fields: Sequence[str] | None):
+    result = {}
+    for key, value in obj.items():
+        if value is None or (excluded and key in excluded):
+            continue
+        # Decoded JSON only holds exact dicts and lists, so skip isinstance.
+        value_type = type(value)
+        if value_type is dict:
+            if (simplify and _kept(value.get("name"), excluded, fields)
+                    and _kept(value.get("odds"), excluded, fields)):
+                value = _condense_selection(value, excluded, fields)
+            else:
+                value = _condense_dict(value, simplify, excluded, fields)
+            if value is None:
+                continue
+        elif value_type is list:
+            value = _condense_list(value, excluded, fields)
+        result[key] = value
+    return result or None
+
+
+def _kept(value: Any, excluded: frozenset, fields: Sequence[str] | None) -> bool:
+    """Whether `value` survives condensing; selections are recognized on condensed names and odds."""
+    if value is None:
+        return False
+    if type(value) is dict:
+        return _condense_dict(value, False, excluded, fields) is not None
+    return True
+
+
+def _condense_list(obj: list, excluded: frozenset, fields: Sequence[str] | None) -> list:
+    # Selections inside lists are kept whole, as the original two-pass condenser did.
+    result = []
+    for item in obj:
+        if item is None:
+            continue
+        item_type = type(item)
+        if item_type is dict:
+            item = _condense_dict(item, False, excluded, fields)
+            if item is None:
+                continue
+        elif item_type is list:
+            item = _condense_list(item, excluded, fields)
+        result.append(item)
+    return result
+
+
+def _condense_selection(selection: dict, excluded: frozenset, fields: Sequence[str] | None):
+    cleaned = _condense_dict(selection, False, excluded, fields)
+    if cleaned is None:
+        return None
+    if fields is None:
+        # if profit equals odds, we can omit profit
+        if cleaned.get("profit") != cleaned.get("odds"):
+            return cleaned
+        fields = _SHORT_SELECTION_FIELDS
+    return {field: cleaned[field] for field in fields if field in cleaned}
+
+
+def mark_stale(odds: Any, age: float) -> dict:
+    """Flag a cached odds payload served because the live lookup failed."""
+    marker = {"stale": True, "stale_age_seconds": round(age)}
+    if isinstance(odds, dict):
+        return {**odds, **marker}
+    return {"odds": odds, **marker}
+
+
+# Short column keys of the tabular odds encoding.
+TABLE_COLUMNS = {"f": "fixture", "m": "market", "l": "line", "s": "selection", "o": "odds"}
+
+
+def iter_selections(odds: Any, path: tuple = ()):
+    """Yield (path, selection) for every selection dict in a condensed odds payload."""
+    if isinstance(odds, dict):
+        if odds.get("name") is not None and odds.get("odds") is not None and path:
+            yield path, odds
+            return
+        for key, value in odds.items():
+            yield from iter_selections(value, path + (key,))
+    elif isinstance(odds, list):
+        for position, item in enumerate(odds):
+            yield from iter_selections(item, path + (str(position),))
+
+
+def _market_and_line(path: tuple) -> tuple[str, str]:
+    for position, key in enumerate(path):
+        if key in MARKETS:
+            return key, "/".join(path[position + 1:-1])
+    return path[0], "/".join(path[1:-1])
+
+
+def flatten_odds(fixture_odds: list) -> list[list]:
+    """One [fixture, market, line, selection, odds] row per selection of each (fixture, odds) pair."""
+    rows = []
+    for fixture, odds in fixture_odds:
+        fixture_id = fixture.get("id")
+        for path, selection in iter_selections(odds):
+            market, line = _market_and_line(path)
+            rows.append([fixture_id, market, line, selection["name"], selection["odds"]])
+    return rows
+
+
+def _market_rank(market: str) -> int:
+    return MARKETS.index(market) if market in MARKETS else len(MARKETS)
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Rough token count of a tool payload (about four characters per token)."""
+    return len(json.dumps(payload, separators=(",", ":"), default=str)) // 4 + 1
+
+
+def fixture_labels(fixture_odds: list) -> tuple[dict, dict]:
+    """"Home vs Away startTime" per fixture id, and the age of odds served stale per fixture id."""
+    labels = {}
+    stale = {}
+    for fixture, odds in fixture_odds:
+        home, away = get_team_names(fixture)
+        labels[fixture.get("id")] = f"{home} vs {away} {fixture.get('startTime', '')}".strip()
+        if isinstance(odds, dict) and odds.get("stale"):
+            stale[fixture.get("id")] = odds["stale_age_seconds"]
+    return labels, stale
+
+
+def encode_odds_table(fixture_odds: list, token_budget: int) -> dict:
+    """
+    Encode (fixture, odds) pairs as a compact table that fits in `token_budget`.
+
+    Rows of the most relevant markets (see MARKETS) are kept first; whatever does
+    not fit is counted per market under "truncated", and fixtures whose odds were
+    served stale (see mark_stale) are listed with their age under "stale".
+    """
+    labels, stale = fixture_labels(fixture_odds)
+
+    rows = flatten_odds(fixture_odds)
+    # Stable sort keeps fixture order inside each market.
+    rows.sort(key=lambda row: _market_rank(row[1]))
+
+    table = {"cols": TABLE_COLUMNS, "fixtures": {}, "rows": []}
+    used = estimate_tokens(table)
+    truncated: dict[str, int] = {}
+    for row in rows:
+        fixture_id = row[0]
+        cost = estimate_tokens(row)
+        if fixture_id not in table["fixtures"]:
+            cost += estimate_tokens({fixture_id: labels[fixture_id]})
+        if truncated or used + cost > token_budget:
+            truncated[row[1]] = truncated.get(row[1], 0) + 1
+            continue
+        table["fixtures"][fixture_id] = labels[fixture_id]
+        table["rows"].append(row)
+        used += cost
+
+    if truncated:
+        table["truncated"] = {"rows": sum(truncated.values()), "markets": truncated}
+    if stale:
+        table["stale"] = {"age_seconds": stale}
+    return table
@@ -0,0 +1,90 @@
+import os
+from dotenv import load_dotenv
+
+from app.chat.odds import ODDS_OUTPUT_FORMAT, TABLE_COLUMNS, fixture_labels, flatten_odds
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+load_dotenv()
+
+# Fair probability bands of the risk tiers: at least LOW is low risk, below HIGH is high risk.
+ODDS_LOW_RISK_PROBABILITY = float(os.getenv("ODDS_LOW_RISK_PROBABILITY", "0.6"))
+ODDS_HIGH_RISK_PROBABILITY = float(os.getenv("ODDS_HIGH_RISK_PROBABILITY", "0.35"))
+# Candidates listed per risk tier.
+ODDS_CANDIDATES_PER_RISK = int(os.getenv("ODDS_CANDIDATES_PER_RISK", "5"))
+
+ANALYTICS_AVAILABLE = np is not None
+if ODDS_OUTPUT_FORMAT == "analytics" and not ANALYTICS_AVAILABLE:
+    print("ODDS_OUTPUT_FORMAT=analytics needs the 'numpy' package, falling back to the table format")
+
+# Selections that win together in every outcome of a market; the rest have one winner.
+WINNING_SELECTIONS = {"double_chance": 2}
+
+ANALYTICS_COLUMNS = {
+    **TABLE_COLUMNS,
+    "p": "fair probability (implied probability without the bookmaker margin)",
+    "mg": "bookmaker margin of the market line",
+}
+RISK_TIERS = ("low_risk", "medium_risk", "high_risk")
+
+
+def analyze_odds(fixture_odds: list, per_tier: int = ODDS_CANDIDATES_PER_RISK) -> dict:
+    """
+    Rank the selections of (fixture, odds) pairs into low, medium and high risk candidates.
+
+    Every selection of flatten_odds is priced in one batch: implied probability
+    1/odds, overround and margin per (fixture, market, line) book, and the fair
+    probability normalized by the overround. Incomplete books (too few selections,
+    or an overround below 1) cannot be normalized and are skipped. Candidates are
+    tiered by fair probability and listed from the lowest margin up.
+    """
+    labels, stale = fixture_labels(fixture_odds)
+    result = {"cols": ANALYTICS_COLUMNS, "fixtures": {}, **{tier: [] for tier in RISK_TIERS}}
+    if stale:
+        result["stale"] = {"age_seconds": stale}
+
+    rows = [row for row in flatten_odds(fixture_odds) if isinstance(row[4], (int, float))]
+    if not rows:
+        result["markets"] = {"priced": 0}
+        return result
+
+    books: dict[tuple, int] = {}
+    book = np.fromiter((books.setdefault((row[0], row[1], row[2]), len(books)) for row in rows),
+                       dtype=np.intp, count=len(rows))
+    odds = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+
+    valid = odds > 1.0
+    implied = np.divide(1.0, odds, out=np.zeros_like(odds), where=valid)
+    winners = np.fromiter((WINNING_SELECTIONS.get(market, 1) for _, market, _ in books),
+                          dtype=np.float64, count=len(books))
+    overround = np.bincount(book, weights=implied, minlength=len(books)) / winners
+    selections = np.bincount(book, weights=valid, minlength=len(books))
+    priced = (selections > winners) & (overround >= 1.0)
+    margin = overround - 1.0
+
+    fair = np.divide(implied, overround[book], out=np.zeros_like(implied), where=priced[book])
+    candidate = valid & priced[book]
+    tiers = {
+        "low_risk": candidate & (fair >= ODDS_LOW_RISK_PROBABILITY),
+        "medium_risk": candidate & (fair >= ODDS_HIGH_RISK_PROBABILITY) & (fair < ODDS_LOW_RISK_PROBABILITY),
+        "high_risk": candidate & (fair < ODDS_HIGH_RISK_PROBABILITY),
+    }
+
+    for tier, mask in tiers.items():
+        positions = np.flatnonzero(mask)
+        # Lowest margin first, then the likeliest selection.
+        order = positions[np.lexsort((-fair[positions], margin[book[positions]]))][:per_tier]
+        for position in order.tolist():
+            fixture_id = rows[position][0]
+            result["fixtures"][fixture_id] = labels[fixture_id]
+            result[tier].append([*rows[position], round(float(fair[position]), 3),
+                                 round(float(margin[book[position]]), 3)])
+
+    result["markets"] = {
+        "priced": int(priced.sum()),
+        "median_margin": round(float(np.median(margin[priced])), 3) if priced.any() else None,
+    }
+    return result
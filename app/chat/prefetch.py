@@ -0,0 +1,139 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import select
+
+from app.chat import models
+from app.chat.tools import fetch_fixture_index, get_fixture_odds
+from app.database import SessionLocal
+
+load_dotenv()
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+# Keep the interval below FIXTURES_CACHE_TTL and ODDS_CACHE_TTL so chats find warm data.
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "45"))
+PREFETCH_JITTER = float(os.getenv("PREFETCH_JITTER", "10"))
+PREFETCH_MAX_BACKOFF = float(os.getenv("PREFETCH_MAX_BACKOFF", "600"))
+PREFETCH_DAYS = int(os.getenv("PREFETCH_DAYS", "2"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# "users" refreshes only sports some user has as sport_id, "all" every row of sports.
+PREFETCH_SPORTS = os.getenv("PREFETCH_SPORTS", "users")
+
+
+class PrefetchScheduler:
+    """Background task that keeps the fixtures feed and upcoming odds warm per sport."""
+
+    def __init__(self):
+        self.sports: dict[int, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _load_sport_ids(self) -> list[int]:
+        async with SessionLocal() as db:
+            if PREFETCH_SPORTS == "all":
+                result = await db.execute(select(models.Sports.id))
+            else:
+                result = await db.execute(
+                    select(models.Users.sport_id).filter(models.Users.sport_id.is_not(None)).distinct()
+                )
+            return list(result.scalars().all())
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+        async def refresh(sport_id: int) -> None:
+            async with semaphore:
+                await self.refresh_sport(sport_id)
+
+        while True:
+            try:
+                sport_ids = await self._load_sport_ids()
+            except Exception as e:
+                print(f"[{datetime.now()}] Prefetch could not load sports: {e}")
+                sport_ids = list(self.sports)
+
+            now = time.monotonic()
+            due = [sport_id for sport_id in sport_ids
+                   if self.sports.get(sport_id, {}).get("next_due", 0) <= now]
+            await asyncio.gather(*(refresh(sport_id) for sport_id in due))
+
+            await asyncio.sleep(PREFETCH_INTERVAL + random.uniform(0, PREFETCH_JITTER))
+
+    async def refresh_sport(self, sport_id: int) -> None:
+        """Reload the feed for one sport and the odds of fixtures starting in the next PREFETCH_DAYS."""
+        state = self.sports.setdefault(sport_id, {"failures": 0, "last_refresh": None})
+        started = time.monotonic()
+        try:
+            index = await fetch_fixture_index(sport_id, refresh=True)
+            now = datetime.now()
+            upcoming = index.between(now, now + timedelta(days=PREFETCH_DAYS))
+            odds = await get_fixture_odds(upcoming, sport_id, refresh=True)
+        except Exception as e:
+            state["failures"] += 1
+            backoff = min(PREFETCH_INTERVAL * 2 ** state["failures"], PREFETCH_MAX_BACKOFF)
+            state["next_due"] = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+            state["last_error"] = str(e)
+            print(f"[{datetime.now()}] Prefetch failed for sport {sport_id}, retrying in {backoff:.0f}s: {e}")
+            return
+
+        state.update(
+            failures=0,
+            next_due=0,
+            last_error=None,
+            last_refresh=time.time(),
+            duration_seconds=time.monotonic() - started,
+            fixtures=len(index),
+            upcoming_fixtures=len(upcoming),
+            odds=len(odds),
+        )
+
+    def stats(self) -> dict:
+        """Per-sport refresh state, including seconds since the last successful refresh."""
+        now = time.time()
+        return {
+            "enabled": PREFETCH_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "sports": {
+                sport_id: {
+                    **{key: value for key, value in state.items() if key != "next_due"},
+                    "lag_seconds": now - state["last_refresh"] if state["last_refresh"] else None,
+                }
+                for sport_id, state in self.sports.items()
+            },
+        }
+
+
+prefetch_scheduler = PrefetchScheduler()
+
+
+class _PrefetchCollector:
+    def collect(self):
+        lag = GaugeMetricFamily("chatbet_prefetch_lag_seconds",
+                                "Seconds since the last successful prefetch of a sport", labels=["sport_id"])
+        failures = GaugeMetricFamily("chatbet_prefetch_failures",
+                                     "Consecutive failed prefetches of a sport", labels=["sport_id"])
+        for sport_id, state in prefetch_scheduler.stats()["sports"].items():
+            if state["lag_seconds"] is not None:
+                lag.add_metric([str(sport_id)], state["lag_seconds"])
+            failures.add_metric([str(sport_id)], state["failures"])
+        return [lag, failures]
+
+
+REGISTRY.register(_PrefetchCollector())
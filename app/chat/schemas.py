@@ -16,7 +16,3 @@ class FixtureInputDate(BaseModel):
 class FixtureInputDates(BaseModel):
     date_1: str = Field(description="first date to search in format YYYY-MM-DD")
     date_2: str = Field(description="second date to search in format YYYY-MM-DD")
-
-class Preferences:
-    favorite_sport: str = None
-    sport_id: int = None
@@ -1,47 +1,155 @@
-from sqlalchemy.orm import Session, joinedload
-from datetime import datetime
-from app.chat import models
-from app.core.error_manager import user_not_found, thread_not_found, user_for_thread_not_found
-from langchain_google_genai import ChatGoogleGenerativeAI
+import hashlib
+import json
 import os
+from datetime import date, datetime, time
+import orjson
 from dotenv import load_dotenv
-from langchain_core.prompts import ChatPromptTemplate
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
+from sqlalchemy import event as sa_event, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.chat import models
+from app.core.error_manager import (
+    invalid_cursor,
+    invalid_filters,
+    sport_not_found,
+    thread_not_found,
+    upstream_unavailable,
+    user_not_found,
+)
 
 from langchain.schema import AIMessage, HumanMessage
 
-from app.chat.schemas import Preferences
-from app.chat.tools import _initialize_tools
-
+from app.chat.agent import agent_config, get_agent
+from app.chat.answer_cache import ANSWER_CACHE_ENABLED, get_or_answer
+from app.chat.context import current_user
+from app.chat.fixture_index import FixtureIndex, get_team_names, starts_between
+from app.chat.history_writer import HISTORY_DURABILITY, history_writer
+from app.chat.memory import MEMORY_MODE, load_summary, message_text, summarizer
+from app.chat.tools import FIXTURES_CACHE_TTL, fetch_fixture_index, get_fixture_odds
+from app.chat.thread_context import (
+    invalidate_sport,
+    invalidate_thread,
+    invalidate_user,
+    load_thread_context,
+    load_user_context,
+    remember_thread_owner,
+)
+from app.database import SessionLocal
+from app.core.cache import TTLCache
+from app.core.metrics import register_cache, span
+from app.core.pagination import decode_cursor, encode_cursor, parse_fields
+from app.core.resilience import UPSTREAM_ERRORS, tool_deadline
 
 load_dotenv()
 
+USERS_CACHE_TTL = float(os.getenv("USERS_CACHE_TTL", "30"))
+# Seconds clients and proxies may reuse /fixtures and /odds responses.
+FIXTURES_API_MAX_AGE = int(os.getenv("FIXTURES_API_MAX_AGE", "60"))
+ODDS_API_MAX_AGE = int(os.getenv("ODDS_API_MAX_AGE", "10"))
+
+# Threads whose stored history has already been checked against the checkpointer.
+_migrated_threads = TTLCache(ttl=24 * 60 * 60, maxsize=10000)
+
+USER_FIELDS = {
+    "id": models.Users.id,
+    "name": models.Users.name,
+    "sport_id": models.Users.sport_id,
+    "sport_name": models.Sports.name,
+}
+
+# Rendered user pages keyed by (limit, cursor, fields); cleared when users or sports change.
+users_cache = register_cache("users", TTLCache(ttl=USERS_CACHE_TTL, maxsize=256))
+
+
+def invalidate_users_cache():
+    users_cache.clear()
+
+
+# Drop cached user listings and chat contexts whenever the ORM writes users, sports or threads.
+# Raw SQL writes (e.g. seed_data.py) bypass these and rely on the cache TTLs.
+@sa_event.listens_for(models.Users, "after_insert")
+@sa_event.listens_for(models.Users, "after_update")
+@sa_event.listens_for(models.Users, "after_delete")
+def _on_user_change(mapper, connection, target):
+    invalidate_user(target.id)
+    invalidate_users_cache()
+
+
+@sa_event.listens_for(models.Sports, "after_insert")
+@sa_event.listens_for(models.Sports, "after_update")
+@sa_event.listens_for(models.Sports, "after_delete")
+def _on_sport_change(mapper, connection, target):
+    invalidate_sport(target.id)
+    invalidate_users_cache()
+
+
+@sa_event.listens_for(models.Threads, "after_delete")
+def _on_thread_delete(mapper, connection, target):
+    invalidate_thread(target.id)
+
+
+async def get_users_service(db: AsyncSession, limit: int = 100, cursor: str | None = None,
+                            fields: str | None = None):
+    """Return one rendered page of users as {"content", "etag", "next_cursor"}.
+
+    Pages are keyset-paginated by id and served from users_cache when possible,
+    in which case no query runs at all.
+    """
+    selected = parse_fields(fields, USER_FIELDS, ["id", "name", "sport_id"])
+    key = (limit, cursor, tuple(selected))
+
+    page = users_cache.get(key)
+    if page is not None:
+        return page
+
+    columns = dict.fromkeys([*selected, "id"])
+    query = (
+        select(*(USER_FIELDS[name].label(name) for name in columns))
+        .order_by(models.Users.id)
+        .limit(limit + 1)
+    )
+    if "sport_name" in columns:
+        # Joined in the same query instead of lazy loading Users.sport per row.
+        query = query.outerjoin(models.Sports, models.Users.sport_id == models.Sports.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            invalid_cursor()
+        query = query.filter(models.Users.id > last_id)
 
-GENAI_API_KEY = os.getenv("GENAI_API_KEY")
+    rows = (await db.execute(query)).mappings().all()
+    next_cursor = encode_cursor([rows[limit - 1]["id"]]) if len(rows) > limit else None
+    content = orjson.dumps([{name: row[name] for name in selected} for row in rows[:limit]])
 
-async def get_users_service(db: Session):
-    users = db.query(models.Users).all()
-    return users
+    page = {
+        "content": content,
+        "etag": f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"',
+        "next_cursor": next_cursor,
+    }
+    users_cache.set(key, page)
+    return page
 
 
-async def initiate_thread_service(user_id: int, db: Session):
-    user = db.query(models.Users).filter(models.Users.id == user_id).first()
+async def initiate_thread_service(user_id: int, db: AsyncSession):
+    user = await load_user_context(user_id, db)
 
     if user:
         new_thread = models.Threads(user_id=user_id)
         db.add(new_thread)
-        db.commit()
-        db.refresh(new_thread)
+        await db.commit()
+        remember_thread_owner(new_thread.id, user_id)
         return {"thread_id": new_thread.id}
     else:
         user_not_found()
 
 
 async def _get_list_history_chat(thread_id, db):
-    history_records = db.query(models.History).filter(
-        models.History.thread_id == thread_id
-    ).order_by(models.History.timestamp.desc()).limit(10).all()
+    result = await db.execute(
+        select(models.History)
+        .filter(models.History.thread_id == thread_id)
+        .order_by(models.History.timestamp.desc())
+        .limit(10)
+    )
+    history_records = result.scalars().all()
 
     # The history is loaded for the agent, so it should be in chronological order.
     # The query gets the last 10 messages in reverse chronological order,
@@ -58,100 +166,325 @@ async def _get_list_history_chat(thread_id, db):
     ]
     return history_list
 
+HISTORY_FIELDS = {
+    "id": models.History.id,
+    "thread_id": models.History.thread_id,
+    "input_message": models.History.input_message,
+    "output_message": models.History.output_message,
+    "timestamp": models.History.timestamp,
+}
+
+
+async def get_thread_history_service(thread_id: int, db: AsyncSession, limit: int,
+                                     cursor: str | None = None, fields: str | None = None):
+    """Page through a thread's history, newest first, using a (timestamp, id) keyset cursor."""
+    if not await db.get(models.Threads, thread_id):
+        thread_not_found()
+
+    selected = parse_fields(fields, HISTORY_FIELDS, list(HISTORY_FIELDS))
+    # The sort key is always read so the next cursor can be built.
+    columns = dict.fromkeys([*selected, "timestamp", "id"])
+
+    query = (
+        select(*(HISTORY_FIELDS[name].label(name) for name in columns))
+        .filter(models.History.thread_id == thread_id)
+        .order_by(models.History.timestamp.desc(), models.History.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        timestamp, history_id = decode_cursor(cursor, 2)
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            invalid_cursor()
+        if not isinstance(history_id, int):
+            invalid_cursor()
+        query = query.filter(
+            tuple_(models.History.timestamp, models.History.id) < tuple_(timestamp, history_id)
+        )
+
+    rows = (await db.execute(query)).mappings().all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([last["timestamp"].isoformat(), last["id"]])
+
+    return {
+        "items": [{name: row[name] for name in selected} for row in page],
+        "next_cursor": next_cursor,
+    }
+
+
+FIXTURE_FIELDS = {
+    "id": lambda fixture: fixture.get("id"),
+    "tournament_id": lambda fixture: fixture.get("tournament_id"),
+    "start_time": lambda fixture: fixture.get("startTime"),
+    "home_team": lambda fixture: get_team_names(fixture)[0],
+    "away_team": lambda fixture: get_team_names(fixture)[1],
+}
+# "odds" is filled from the odds lookup rather than read from the fixture.
+ODDS_FIELDS = {**FIXTURE_FIELDS, "odds": None}
+
+# Rendered /fixtures pages keyed by the feed snapshot digest and the query, so a
+# new snapshot never serves an old page and no invalidation is needed.
+fixture_pages = register_cache("fixture_pages", TTLCache(ttl=max(FIXTURES_CACHE_TTL, 1), maxsize=512))
+
+
+async def _fixture_index(sport_id: int, db: AsyncSession) -> FixtureIndex:
+    if not await db.get(models.Sports, sport_id):
+        sport_not_found()
+    try:
+        with tool_deadline():
+            return await fetch_fixture_index(sport_id)
+    except UPSTREAM_ERRORS:
+        upstream_unavailable()
+
+
+def _check_filters(teams: list[str], on: date | None, date_from: date | None, date_to: date | None,
+                   fixture_ids: list[str] | None = None) -> None:
+    """Reject /fixtures and /odds filter combinations before the feed is fetched."""
+    if len(teams) > 2:
+        invalid_filters("At most two teams can be given")
+    if on and (date_from or date_to):
+        invalid_filters("Use either date or date_from/date_to")
+    if fixture_ids is not None and (teams or on or date_from or date_to):
+        invalid_filters("fixture_ids cannot be combined with other filters")
+
+
+def _select_fixtures(index: FixtureIndex, teams: list[str], on: date | None, date_from: date | None,
+                     date_to: date | None, fixture_ids: list[str] | None = None) -> list:
+    """Fixtures of the index matching the /fixtures and /odds filters (see _check_filters)."""
+    if fixture_ids is not None:
+        return index.by_ids(fixture_ids)
+
+    if on:
+        date_from = date_to = on
+    dated = date_from is not None or date_to is not None
+    start = datetime.combine(date_from or date.min, time.min)
+    end = datetime.combine(date_to or date.max, time.max)
+
+    if len(teams) == 2:
+        fixtures = index.by_teams(*teams)
+    elif teams:
+        fixtures = index.by_team_name(teams[0])
+    elif dated:
+        return index.between(start, end)
+    else:
+        return index.fixtures
+    if dated:
+        in_range = starts_between(start, end)
+        fixtures = [fixture for fixture in fixtures if in_range(fixture)]
+    return fixtures
+
+
+def _paginate(items: list, limit: int, cursor: str | None) -> tuple[list, str | None]:
+    """Offset cursor into a list taken from one feed snapshot."""
+    offset = 0
+    if cursor:
+        (offset,) = decode_cursor(cursor, 1)
+        if not isinstance(offset, int) or offset < 0:
+            invalid_cursor()
+    page = items[offset:offset + limit]
+    next_cursor = encode_cursor([offset + limit]) if offset + limit < len(items) else None
+    return page, next_cursor
+
+
+def _render_page(items: list, next_cursor: str | None, cache_control: str) -> dict:
+    content = orjson.dumps(items)
+    return {
+        "content": content,
+        "etag": f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"',
+        "next_cursor": next_cursor,
+        "cache_control": cache_control,
+    }
+
+
+async def get_fixtures_service(sport_id: int, db: AsyncSession, teams: list[str], on: date | None = None,
+                               date_from: date | None = None, date_to: date | None = None,
+                               limit: int = 50, cursor: str | None = None, fields: str | None = None):
+    """Return one rendered page of a sport's fixtures as {"content", "etag", "next_cursor", "cache_control"}.
+
+    Pages come from the cached fixtures feed and are kept per feed snapshot, so
+    repeated lookups neither call the sports API nor filter the feed again.
+    """
+    selected = parse_fields(fields, FIXTURE_FIELDS, ["id", "start_time", "home_team", "away_team"])
+    _check_filters(teams, on, date_from, date_to)
+    index = await _fixture_index(sport_id, db)
+    key = (sport_id, index.digest, tuple(teams), on, date_from, date_to, limit, cursor, tuple(selected))
+
+    # Indexes built without caching have no snapshot digest to key pages on.
+    page = fixture_pages.get(key) if index.digest else None
+    if page is not None:
+        return page
+
+    fixtures, next_cursor = _paginate(_select_fixtures(index, teams, on, date_from, date_to), limit, cursor)
+    items = [{name: FIXTURE_FIELDS[name](fixture) for name in selected} for fixture in fixtures]
+    page = _render_page(items, next_cursor, f"public, max-age={FIXTURES_API_MAX_AGE}")
+    if index.digest:
+        fixture_pages.set(key, page)
+    return page
+
+
+async def get_odds_service(sport_id: int, db: AsyncSession, fixture_ids: str | None, teams: list[str], on: date | None = None,
+                           date_from: date | None = None, date_to: date | None = None,
+                           limit: int = 20, cursor: str | None = None, fields: str | None = None):
+    """Return one rendered page of fixtures with their condensed odds, like get_fixtures_service.
+
+    Odds are only looked up for the fixtures of the requested page. Pages holding
+    stale odds (see mark_stale) or missing some are sent with Cache-Control: no-cache.
+    """
+    selected = parse_fields(fields, ODDS_FIELDS, ["id", "start_time", "home_team", "away_team", "odds"])
+    ids = [fixture_id.strip() for fixture_id in fixture_ids.split(",") if fixture_id.strip()] if fixture_ids else None
+    _check_filters(teams, on, date_from, date_to, ids)
+    index = await _fixture_index(sport_id, db)
+    fixtures, next_cursor = _paginate(_select_fixtures(index, teams, on, date_from, date_to, ids), limit, cursor)
+
+    odds = {}
+    if "odds" in selected and fixtures:
+        with tool_deadline():
+            pairs = await get_fixture_odds(fixtures, sport_id)
+        odds = {fixture.get("id"): fixture_odds for fixture, fixture_odds in pairs}
+
+    items = [
+        {name: odds.get(fixture.get("id")) if name == "odds" else FIXTURE_FIELDS[name](fixture) for name in selected}
+        for fixture in fixtures
+    ]
+    stale = any(isinstance(fixture_odds, dict) and fixture_odds.get("stale") for fixture_odds in odds.values())
+    # Fixtures whose odds could neither be fetched nor served stale are left out of `odds`.
+    missing = "odds" in selected and any(fixture.get("id") not in odds for fixture in fixtures)
+    return _render_page(items, next_cursor,
+                        "no-cache" if stale or missing else f"public, max-age={ODDS_API_MAX_AGE}")
+
+
 async def _load_chat_history(agent_executor, config: dict, thread_id: int, db):
-    """Carga el historial del chat y actualiza el estado del agente."""
-    chat_history = await _get_list_history_chat(thread_id, db)
-    for message in chat_history:
-        if message.get('input_message'):
-            agent_executor.update_state(config, {"messages": [HumanMessage(content=message.get('input_message'))]})
-        if message.get('output_message'):
-            agent_executor.update_state(config, {"messages": [AIMessage(content=message.get('output_message'))]})
+    """Migra el historial del chat al checkpointer la primera vez que se retoma el hilo."""
+    if _migrated_threads.get(thread_id):
+        return
+
+    snapshot = await agent_executor.aget_state(config)
+    if not snapshot.values.get("messages"):
+        chat_history = await _get_list_history_chat(thread_id, db)
+        messages = []
+        for message in chat_history:
+            if message.get('input_message'):
+                messages.append(HumanMessage(content=message.get('input_message')))
+            if message.get('output_message'):
+                messages.append(AIMessage(content=message.get('output_message')))
+        if messages:
+            await agent_executor.aupdate_state(config, {"messages": messages})
+
+    _migrated_threads.set(thread_id, True)
 
 async def _save_chat_to_history(thread_id, input_message, output_message, db):
+    if HISTORY_DURABILITY == "batched" and history_writer.running:
+        await history_writer.put(thread_id, input_message, output_message)
+        return None
+
     new_history = models.History(
         thread_id=thread_id,
         input_message=input_message,
         output_message=output_message
     )
     db.add(new_history)
-    db.commit()
-    db.refresh(new_history)
+    await db.commit()
     return new_history
 
 
-async def initiate_chat_service(query: str, thread_id: int, db: Session):
-    register_thread = db.query(models.Threads).filter(models.Threads.id == thread_id).first()
-    if not register_thread:
-        thread_not_found()
+async def _prepare_chat(thread_id: int, db: AsyncSession):
+    """Resolve the thread's user and return the agent and its invocation config."""
+    with span("user_context"):
+        user_context = await load_thread_context(thread_id, db)
+    # Scoped to this request's task, so concurrent chats never see each other's sport.
+    current_user.set(user_context)
+
+    with span("agent_setup"):
+        agent_executor = await get_agent()
+    summary, summarized_turns = None, 0
+    if MEMORY_MODE == "summary":
+        with span("summary_load"):
+            summary, summarized_turns = await load_summary(thread_id, db)
+    config_invocation = agent_config(thread_id, user_context.name, user_context.favorite_sport,
+                                     summary, summarized_turns)
 
-    user_id = register_thread.user_id
-    user = db.query(models.Users).options(joinedload(models.Users.sport)).filter(models.Users.id == user_id).first()
-    if not user:
-        user_for_thread_not_found()
+    with span("history_load"):
+        await _load_chat_history(agent_executor, config_invocation, thread_id, db)
 
-    if user.sport:
-        Preferences.favorite_sport = user.sport.name
-        Preferences.sport_id = user.sport.id
+    return agent_executor, config_invocation, user_context
+
+
+async def initiate_chat_service(query: str, thread_id: int, db: AsyncSession):
+    agent_executor, config_invocation, user_context = await _prepare_chat(thread_id, db)
+
+    async def run_agent():
+        # Run on the application event loop so tools share its pooled HTTP client.
+        with span("agent_run"):
+            result = await agent_executor.ainvoke({"messages": [HumanMessage(content=query)]},
+                                                  config_invocation)
+        # Gemini may answer with a list of content parts; history stores and returns the text.
+        return message_text(result["messages"][-1].content)
+
+    # Follow-up questions depend on the thread, so only a thread's first turn is answered from the cache.
+    if ANSWER_CACHE_ENABLED and not (await agent_executor.aget_state(config_invocation)).values.get("messages"):
+        current_date = config_invocation["configurable"]["current_date"]
+        output, hit = await get_or_answer(query, user_context, current_date, run_agent)
+        if hit:
+            # Keep the thread's conversation state as if the agent had answered.
+            await agent_executor.aupdate_state(
+                config_invocation,
+                {"messages": [HumanMessage(content=query), AIMessage(content=output)]},
+                as_node="agent",
+            )
     else:
-        Preferences.favorite_sport = None
-        Preferences.sport_id = None
-    name = user.name
-
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=GENAI_API_KEY)
-    tools = await _initialize_tools()
-
-    base_prompt = f"""
-    You are ChatBet, an AI assistant that helps users manage their bets and provides information about sports events.
-    The user's name is {name}.
-    The user's favorite sport is {Preferences.favorite_sport}.
-    Use the tools below to get information about sports events and manage bets.
-    Be proactive in offering help with betting management.
-    When giving details about a bet, consider all possibilities of betting odds and suggest the best option.
-    Not only focus on 1x2 odds, but also consider other odds that might be more advantageous for the user.
-    The odds are:  both_teams_to_score, double_chance, over_under, handicap, half_time_total, half_time_result, etc
-    If you don't know the answer to a question, you should ask the user for more information.
-    Take into account today's date when providing information about sports events.
-    Current date: {datetime.now().strftime('%A, %Y-%m-%d')}
-    Examples of interactions:
-    User: "Which team has the best odds tomorrow?"
-    ChatBet: (uses tool to check_odd_by_dates)
-    ChatBet: The term "best odds" can mean two different things:
-
-    The Highest Potential Payout: The biggest number, which represents the riskiest bet but offers the largest reward.
-
-    The Most Likely Outcome: The smallest number, which represents the safest bet with the highest probability of happening, but offers the smallest reward.
-    Let's break it down based on the data we found for tomorrow:
+        output = await run_agent()
+
+    with span("history_save"):
+        await _save_chat_to_history(thread_id, query, output, db)
+    summarizer.schedule(thread_id, config_invocation)
     
-    ...
-    User: Give me a recommendation for Sunday
-    ChatBet: (uses tool to check_odd_by_date)
-    ChatBet: Based on the fixtures and odds available for Sunday, here are some recommendations based on risk levels:
-    1. Conservative Option: (details of low-risk bets)
-    2. Moderate Value Option: (details of medium-risk bets)
-    3. Risky Option -Higher Payout: (details of high-risk bets)
+    return output
+
+
+async def stream_chat_service(query: str, thread_id: int, db: AsyncSession):
+    """Return an async iterator of NDJSON events for one chat turn.
+
+    Lookups run before the first byte so missing threads still answer 404.
     """
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", base_prompt),
-        ("placeholder", "{messages}"),
-    ])
-
-    memory = MemorySaver()
-
-    agent_executor = create_react_agent(
-        model=llm,
-        tools=tools,
-        prompt=prompt,
-        checkpointer=memory
-    )
+    agent_executor, config_invocation, user_context = await _prepare_chat(thread_id, db)
 
-    config_invocation = {"configurable": {"thread_id": f"thread_{thread_id}"}}
+    async def events():
+        # The body runs in the response task, so scope the user to it again.
+        current_user.set(user_context)
+        output = None
+        try:
+            async for event in agent_executor.astream_events(
+                {"messages": [HumanMessage(content=query)]}, config_invocation, version="v2"
+            ):
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    text = message_text(event["data"]["chunk"].content)
+                    if text:
+                        yield _ndjson({"event": "token", "content": text})
+                elif kind == "on_tool_start":
+                    yield _ndjson({"event": "tool_start", "name": event["name"],
+                                   "input": event["data"].get("input")})
+                elif kind == "on_tool_end":
+                    yield _ndjson({"event": "tool_end", "name": event["name"]})
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    output = message_text(event["data"]["output"]["messages"][-1].content)
+        except Exception as e:
+            yield _ndjson({"event": "error", "detail": str(e)})
+            return
 
-    await _load_chat_history(agent_executor, config_invocation, thread_id, db)
+        # The request session may already be closed once the response is streaming.
+        async with SessionLocal() as session:
+            await _save_chat_to_history(thread_id, query, output, session)
+        summarizer.schedule(thread_id, config_invocation)
 
-    result = agent_executor.invoke({"messages": [HumanMessage(content=query)]},
-                                   config_invocation) 
-    
-    await _save_chat_to_history(thread_id, query, result["messages"][-1].content, db)
-    
-    return result["messages"][-1].content
\ No newline at end of file
+        yield _ndjson({"event": "end", "content": output})
+
+    return events()
+
+
+def _ndjson(payload: dict) -> str:
+    return json.dumps(payload, default=str) + "\n"
@@ -0,0 +1,93 @@
+import os
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.chat import models
+from app.chat.context import UserContext
+from app.core.cache import TTLCache
+from app.core.error_manager import thread_not_found, user_for_thread_not_found
+from app.core.metrics import register_cache
+
+load_dotenv()
+
+USER_CONTEXT_CACHE_TTL = float(os.getenv("USER_CONTEXT_CACHE_TTL", "300"))
+USER_CONTEXT_CACHE_MAXSIZE = int(os.getenv("USER_CONTEXT_CACHE_MAXSIZE", "10000"))
+
+# Threads never change owner, so thread -> user entries only age out of the LRU.
+thread_owners = register_cache("thread_owners", TTLCache(ttl=float("inf"), maxsize=USER_CONTEXT_CACHE_MAXSIZE))
+# User name and sport change rarely; entries are dropped explicitly when they do.
+user_contexts = register_cache("user_contexts", TTLCache(ttl=USER_CONTEXT_CACHE_TTL, maxsize=USER_CONTEXT_CACHE_MAXSIZE))
+
+
+def _user_context_columns():
+    return (models.Users.id, models.Users.name, models.Sports.id.label("sport_id"),
+            models.Sports.name.label("sport_name"))
+
+
+def _to_user_context(row) -> UserContext:
+    return UserContext(user_id=row.id, name=row.name, sport_id=row.sport_id, favorite_sport=row.sport_name)
+
+
+async def load_thread_context(thread_id: int, db: AsyncSession) -> UserContext:
+    """Resolve thread -> user -> sport in one joined query, or from the cache."""
+    user_id = thread_owners.get(thread_id)
+    if user_id is not None:
+        user_context = user_contexts.get(user_id)
+        if user_context is not None:
+            return user_context
+
+    result = await db.execute(
+        select(models.Threads.user_id.label("thread_user_id"), *_user_context_columns())
+        .select_from(models.Threads)
+        .outerjoin(models.Users, models.Users.id == models.Threads.user_id)
+        .outerjoin(models.Sports, models.Sports.id == models.Users.sport_id)
+        .filter(models.Threads.id == thread_id)
+    )
+    row = result.first()
+    if row is None:
+        thread_not_found()
+    if row.id is None:
+        user_for_thread_not_found()
+
+    user_context = _to_user_context(row)
+    thread_owners.set(thread_id, row.id)
+    user_contexts.set(row.id, user_context)
+    return user_context
+
+
+async def load_user_context(user_id: int, db: AsyncSession) -> UserContext | None:
+    """The user's context from the cache, or one joined query on a miss."""
+    user_context = user_contexts.get(user_id)
+    if user_context is not None:
+        return user_context
+
+    result = await db.execute(
+        select(*_user_context_columns())
+        .outerjoin(models.Sports, models.Sports.id == models.Users.sport_id)
+        .filter(models.Users.id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    user_context = _to_user_context(row)
+    user_contexts.set(user_id, user_context)
+    return user_context
+
+
+def remember_thread_owner(thread_id: int, user_id: int) -> None:
+    thread_owners.set(thread_id, user_id)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_contexts.pop(user_id)
+
+
+def invalidate_sport(sport_id: int) -> None:
+    # Sport names are copied into every user context, so drop them all.
+    user_contexts.clear()
+
+
+def invalidate_thread(thread_id: int) -> None:
+    thread_owners.pop(thread_id)
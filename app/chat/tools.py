@@ -1,20 +1,107 @@
 import asyncio
+import hashlib
 import httpx
+import orjson
 import os
+import weakref
+from contextlib import asynccontextmanager
 from langchain.tools import StructuredTool
 from dotenv import load_dotenv
-from datetime import datetime
-from typing import Any, Dict, List
-from app.chat.schemas import FixtureInput, FixtureInputDate, FixtureInputDates, FixtureInputTeam, Preferences
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+from app.chat.cache_backend import SharedCache
+from app.chat.fixture_feed import iter_fixtures, project_fixture
+from app.chat.fixture_index import FixtureIndex, involves_teams, parse_start_time, starts_between
+from app.chat.odds import ODDS_OUTPUT_FORMAT, ODDS_TOKEN_BUDGET, condense_betting_json, encode_odds_table, mark_stale
+from app.chat.odds_analytics import ANALYTICS_AVAILABLE, analyze_odds
+from app.chat.context import get_user_context
+from app.chat.schemas import FixtureInput, FixtureInputDate, FixtureInputDates, FixtureInputTeam
+from app.core.cache import TTLCache
+from app.core.http_client import FIXTURES_TIMEOUT, ODDS_TIMEOUT, endpoint_timeout, upstream_client
+from app.core.metrics import ODDS_FANOUT, register_cache, span
+from app.core.resilience import (
+    UPSTREAM_ERRORS,
+    call_upstream,
+    record_fallback,
+    remaining_timeout,
+    tool_deadline,
+)
 
 load_dotenv()
 QUERY_API_URL = os.getenv("QUERY_API_URL")
+FIXTURES_CACHE_TTL = float(os.getenv("FIXTURES_CACHE_TTL", "300"))
+ODDS_CACHE_TTL = float(os.getenv("ODDS_CACHE_TTL", "60"))
+ODDS_CACHE_MAXSIZE = int(os.getenv("ODDS_CACHE_MAXSIZE", "5000"))
+ODDS_MAX_CONCURRENCY = int(os.getenv("ODDS_MAX_CONCURRENCY", "10"))
+# Separate, smaller limit for background refreshes (prefetch), so chats never queue behind them.
+ODDS_REFRESH_CONCURRENCY = int(os.getenv("ODDS_REFRESH_CONCURRENCY", "2"))
+
+# Digest of the last fixtures feed per sport and of the last odds per fixture, and a
+# per-sport counter bumped whenever one of them changes (see snapshot_fingerprint).
+_snapshot_digests = TTLCache(ttl=float("inf"), maxsize=ODDS_CACHE_MAXSIZE + 64)
+_snapshot_generations: Dict[Any, int] = {}
+
+def _record_snapshot(sport_id: int | None, part: Any, payload: Any) -> bytes:
+    digest = hashlib.blake2b(orjson.dumps(payload), digest_size=8).digest()
+    if _snapshot_digests.get((sport_id, part)) != digest:
+        _snapshot_digests.set((sport_id, part), digest)
+        _snapshot_generations[sport_id] = _snapshot_generations.get(sport_id, 0) + 1
+    return digest
+
+def snapshot_fingerprint(sport_id: int | None) -> str:
+    """Changes whenever a fixtures feed or odds payload downloaded for the sport differs from the previous one."""
+    return f"{sport_id}:{_snapshot_generations.get(sport_id, 0)}"
+
+def _fixtures_snapshot(key: tuple, fixtures: List[Dict[str, Any]]) -> FixtureIndex:
+    digest = _record_snapshot(key[0], "fixtures", fixtures)
+    return FixtureIndex(fixtures, digest=digest.hex())
+
+def _odds_snapshot(key: tuple, odds: Any) -> Any:
+    _record_snapshot(key[0], key[1], odds)
+    return odds
+
+# Shared by every chat in the process (and, with CACHE_BACKEND=database, by every
+# worker), keyed by (sportId, type, language).
+fixtures_cache = register_cache("fixtures", SharedCache("fixtures", FIXTURES_CACHE_TTL, 64, build=_fixtures_snapshot))
+# Condensed odds keyed by (sportId, fixtureId, tournamentId, amount).
+odds_cache = register_cache("odds", SharedCache("odds", ODDS_CACHE_TTL, ODDS_CACHE_MAXSIZE, build=_odds_snapshot))
+
+_odds_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[bool, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def _odds_semaphore(refresh: bool = False) -> asyncio.Semaphore:
+    """Limit in-flight odds lookups across every chat running on this loop.
+
+    A lookup missing from the local cache holds its slot for the shared cache
+    backend's queries as well as the /sports/odds request, so a fan-out cannot
+    drain the database pool either.
+    Refreshes draw from their own ODDS_REFRESH_CONCURRENCY slots.
+    """
+    loop = asyncio.get_running_loop()
+    semaphores = _odds_semaphores.get(loop)
+    if semaphores is None:
+        semaphores = _odds_semaphores[loop] = {
+            False: asyncio.Semaphore(ODDS_MAX_CONCURRENCY),
+            True: asyncio.Semaphore(ODDS_REFRESH_CONCURRENCY),
+        }
+    return semaphores[refresh]
+
+@asynccontextmanager
+async def _odds_slot(refresh: bool = False):
+    """Hold an odds slot, waiting for one no longer than the current tool_deadline."""
+    semaphore = _odds_semaphore(refresh)
+    await asyncio.wait_for(semaphore.acquire(), remaining_timeout())
+    try:
+        yield
+    finally:
+        semaphore.release()
 
-async def fixture_parameters_request():
+async def fixture_parameters_request(sport_id: int | None):
     url = f"{QUERY_API_URL}/sports/sports-fixtures"
 
     params = {
-        "sportId": Preferences.sport_id,
+        "sportId": sport_id,
         "type": "pre_match",
         "time_zone": "UTC",
         "language": "en"
@@ -26,22 +113,57 @@ async def fixture_parameters_request():
 
     return url, params, headers
 
+async def fetch_fixture_index(sport_id: int | None = None,
+                              prefilter: Callable[[Dict[str, Any]], bool] | None = None,
+                              refresh: bool = False) -> FixtureIndex:
+    """get the indexed sports fixtures feed for a sport (the current user's by default), served from the shared cache
+
+    The feed is parsed as it streams in and only projected fixtures are kept.
+    With caching disabled, `prefilter` is applied per fixture so only candidates
+    for the current lookup are materialized.
+    """
+    if sport_id is None:
+        sport_id = get_user_context().sport_id
+
+    url, params, headers = await fixture_parameters_request(sport_id)
+    key = (params["sportId"], params["type"], params["language"])
+
+    async def download(predicate=None):
+        async def attempt(seconds):
+            async with upstream_client() as client:
+                async with client.stream("GET", url, params=params, headers=headers,
+                                         timeout=endpoint_timeout(seconds)) as response:
+                    response.raise_for_status()
+                    return [
+                        project_fixture(fixture) async for fixture in iter_fixtures(response)
+                        if predicate is None or predicate(fixture)
+                    ]
+
+        return await call_upstream("sports_fixtures", attempt, FIXTURES_TIMEOUT)
+
+    if FIXTURES_CACHE_TTL <= 0:
+        # Prefiltered downloads hold a different subset per lookup, so they are not recorded as snapshots.
+        return FixtureIndex(await download(prefilter))
+    try:
+        return await fixtures_cache.get_or_load(key, download, refresh=refresh)
+    except UPSTREAM_ERRORS:
+        stale = None if refresh else await fixtures_cache.get_stale(key)
+        if stale is None:
+            record_fallback("sports_fixtures", "error")
+            raise
+        record_fallback("sports_fixtures", "stale")
+        # get_stale builds a fresh index, so marking it leaves the cached snapshot alone.
+        index = stale[0]
+        index.stale_age = stale[1]
+        return index
+
 async def get_fixtures_by_teams(team_1: str, team_2: str) -> List[Dict[str, Any]]:
     """get sports fixtures data for specified teams"""
 
-    url, params, headers = await fixture_parameters_request()
+    with tool_deadline():
+        index = await fetch_fixture_index(prefilter=involves_teams(team_1))
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        
-        selected_fixtures = [
-            fixture for fixture in response.json()
-            if {fixture.get("home_team_data", {}).get("name", {}).get("en"),
-                fixture.get("away_team_data", {}).get("name", {}).get("en")} == {team_1, team_2}
-        ]
-                
-        return selected_fixtures
+    return index.marked(index.by_teams(team_1, team_2))
     
 def get_fixtures_by_teams_sync(team_1: str, team_2: str) -> List[Dict[str, Any]]:
     return asyncio.run(get_fixtures_by_teams(team_1, team_2))
@@ -49,27 +171,16 @@ def get_fixtures_by_teams_sync(team_1: str, team_2: str) -> List[Dict[str, Any]]
 async def get_fixtures_by_team(team: str) -> List[Dict[str, Any]]:
     """get sports fixtures data for one specified team"""
 
-    url, params, headers = await fixture_parameters_request()
+    with tool_deadline():
+        index = await fetch_fixture_index(prefilter=involves_teams(team))
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        
-        selected_fixtures = [
-            fixture for fixture in response.json()
-            if team in {fixture.get("home_team_data", {}).get("name", {}).get("en"),
-                        fixture.get("away_team_data", {}).get("name", {}).get("en")}
-        ]
-
-        return selected_fixtures
+    return index.marked(index.by_team_name(team))
     
 def get_fixtures_by_team_sync(team: str) -> List[Dict[str, Any]]:
     return asyncio.run(get_fixtures_by_team(team))
 
 def get_fixture_datestamp(fixture) -> datetime:
-    str_date_time = fixture.get("startTime")
-    date_time = datetime.strptime(str_date_time, "%m-%d %H:%M")
-    return date_time.replace(year=datetime.now().year)
+    return parse_start_time(fixture.get("startTime"), datetime.now().year)
 
 def get_fixture_date(fixture) -> str:
     return get_fixture_datestamp(fixture).strftime("%Y-%m-%d")
@@ -77,29 +188,12 @@ def get_fixture_date(fixture) -> str:
 async def get_fixtures_by_date(date: str) -> List[Dict[str, Any]]:
     """get sports fixtures data for one specified date"""
 
-    url = f"{QUERY_API_URL}/sports/sports-fixtures"
+    date_obj = datetime.strptime(date, "%Y-%m-%d")
 
-    params = {
-        "sportId": Preferences.sport_id,
-        "type": "pre_match",
-        "time_zone": "UTC",
-        "language": "en"
-    }
+    with tool_deadline():
+        index = await fetch_fixture_index(prefilter=starts_between(date_obj, date_obj + timedelta(days=1)))
 
-    headers = {
-        "accept": "application/json"
-    }
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        
-        selected_fixtures =[
-            fixture for fixture in response.json()
-            if get_fixture_date(fixture) == date
-        ]
-
-        return selected_fixtures
+    return index.marked(index.on_date(date_obj))
 
 def get_fixtures_by_date_sync(date: str) -> str:
     return asyncio.run(get_fixtures_by_date(date))
@@ -109,82 +203,19 @@ async def get_fixtures_by_dates(date_1, date_2) -> List[Dict[str, Any]]:
     date_1_obj = datetime.strptime(date_1, "%Y-%m-%d")
     date_2_obj = datetime.strptime(date_2, "%Y-%m-%d")
     
-    url, params, headers = await fixture_parameters_request()
-
-    selected_fixtures = []
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    with tool_deadline():
+        index = await fetch_fixture_index(prefilter=starts_between(date_1_obj, date_2_obj + timedelta(days=1)))
 
-        response = await client.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        
-        all_fixtures = response.json()
-        selected_fixtures = [
-            fixture for fixture in all_fixtures
-            if date_1_obj <= get_fixture_datestamp(fixture) <= date_2_obj
-        ]
-
-    return selected_fixtures
+    return index.marked(index.between(date_1_obj, date_2_obj))
     
 def get_fixtures_by_dates_sync(date_1, date_2) -> List[Dict[str, Any]]:
     return asyncio.run(get_fixtures_by_dates(date_1, date_2))
 
-def condense_betting_json(data):
-    """
-    Condense betting JSON by removing null values and redundant structures.
-    """
-    
-    def remove_nulls_and_redundant(obj):
-        """Remove null values and redundant structures"""
-        if isinstance(obj, dict):
-            result = {}
-            for key, value in obj.items():
-                if value is not None:
-                    cleaned_value = remove_nulls_and_redundant(value)
-                    if cleaned_value is not None and cleaned_value != {}:
-                        result[key] = cleaned_value
-            return result if result else None
-        elif isinstance(obj, list):
-            result = [remove_nulls_and_redundant(item) for item in obj if item is not None]
-            return [item for item in result if item is not None and item != {}]
-        else:
-            return obj
-    
-    def simplify_bet_structure(bet_data):
-        """Simplify bet structure to essential fields"""
-        if not isinstance(bet_data, dict):
-            return bet_data
-            
-        simplified = {}
-        for key, value in bet_data.items():
-            if isinstance(value, dict) and 'name' in value and 'odds' in value:
-                # if profit equals odds, we can omit profit
-                if value.get('profit') == value.get('odds'):
-                    simplified[key] = {
-                        'name': value['name'],
-                        'odds': value['odds'],
-                        'betId': value['betId']
-                    }
-                else:
-                    simplified[key] = value
-            else:
-                simplified[key] = simplify_bet_structure(value)
-        
-        return simplified
-    
-    # Clean null values
-    cleaned = remove_nulls_and_redundant(data)
-    
-    # Simplify bet structure
-    condensed = simplify_bet_structure(cleaned)
-    
-    return condensed
-
-
-async def _fetch_single_odd(client: httpx.AsyncClient, fixture: Dict[str, Any]) -> Dict[str, Any] | None:
+async def _fetch_single_odd(client: httpx.AsyncClient, fixture: Dict[str, Any], sports_id: int | None,
+                            refresh: bool = False) -> Dict[str, Any] | None:
     """Helper coroutine to fetch odds for a single fixture concurrently."""
     fixture_id = fixture.get("id")
     
-    sports_id = Preferences.sport_id
     tournament_id = fixture.get("tournament_id")
     amount = 1
 
@@ -197,58 +228,88 @@ async def _fetch_single_odd(client: httpx.AsyncClient, fixture: Dict[str, Any])
     }
     headers = {"accept": "application/json"}
 
-    try:
-        response = await client.get(url, params=params, headers=headers)
+    async def attempt(seconds):
+        response = await client.get(url, params=params, headers=headers, timeout=endpoint_timeout(seconds))
         response.raise_for_status()
-        return condense_betting_json(response.json())
-    except httpx.ReadTimeout:
-        print(f"[{datetime.now()}] Timeout fetching odds for fixture ID: {fixture_id}")
-        return None
-    except httpx.HTTPStatusError as e:
-        print(f"[{datetime.now()}] HTTP error for fixture ID {fixture_id}: {e}")
-        return None
+        return response.json()
 
+    async def download():
+        return condense_betting_json(await call_upstream("sports_odds", attempt, ODDS_TIMEOUT, hedge=True))
 
-async def get_odds(fixtures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Fetch odds for a list of fixtures concurrently."""
-    print(f"[{datetime.now()}] --- Starting get_odds for {len(fixtures)} fixtures ---")
+    key = (sports_id, fixture_id, tournament_id, amount)
+    if not refresh:
+        # Odds already held by this process never wait for a slot behind in-flight downloads.
+        cached = odds_cache.local.get(key)
+        if cached is not None:
+            return cached
+    try:
+        async with _odds_slot(refresh):
+            # Failures are not cached; duplicate in-flight requests share one download.
+            return await odds_cache.get_or_load(key, download, refresh=refresh)
+    except UPSTREAM_ERRORS:
+        # Counted by outcome in chatbet_upstream_requests_total and by fallback served.
+        stale = None if refresh else await odds_cache.get_stale(key)
+        if stale is None:
+            record_fallback("sports_odds", "none")
+            return None
+        record_fallback("sports_odds", "stale")
+        return mark_stale(stale[0], stale[1])
+
+
+async def get_fixture_odds(fixtures: List[Dict[str, Any]], sport_id: int | None = None,
+                           refresh: bool = False) -> List[tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Fetch odds for a list of fixtures concurrently, paired with their fixture."""
+    ODDS_FANOUT.observe(len(fixtures))
+    if sport_id is None:
+        sport_id = get_user_context().sport_id
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        tasks = [_fetch_single_odd(client, f) for f in fixtures]
-        results = await asyncio.gather(*tasks)
-        odds = [r for r in results if r is not None]
+    with span("odds_fanout"):
+        async with upstream_client() as client:
+            tasks = [_fetch_single_odd(client, f, sport_id, refresh) for f in fixtures]
+            results = await asyncio.gather(*tasks)
 
-    return odds
+    return [(fixture, odds) for fixture, odds in zip(fixtures, results) if odds is not None]
 
-async def check_odds_by_teams(team_1: str, team_2: str) -> List[Dict[str, Any]]:
-    """get betting odds for specified teams"""
-    fixtures = await get_fixtures_by_teams(team_1, team_2)
-                
+async def get_odds(fixtures: List[Dict[str, Any]], sport_id: int | None = None) -> List[Dict[str, Any]]:
+    """Fetch odds for a list of fixtures concurrently."""
+    return [odds for _, odds in await get_fixture_odds(fixtures, sport_id)]
+
+async def odds_tool_output(fixtures: List[Dict[str, Any]]) -> Any:
+    """Odds for the check_odds_by_* tools, in the configured ODDS_OUTPUT_FORMAT."""
+    if ODDS_OUTPUT_FORMAT == "analytics" and ANALYTICS_AVAILABLE:
+        return analyze_odds(await get_fixture_odds(fixtures))
+    if ODDS_OUTPUT_FORMAT in ("table", "analytics"):
+        return encode_odds_table(await get_fixture_odds(fixtures), ODDS_TOKEN_BUDGET)
     return await get_odds(fixtures)
 
-def check_odds_by_teams_sync(team_1: str, team_2: str) -> List[Dict[str, Any]]:
+async def check_odds_by_teams(team_1: str, team_2: str) -> Any:
+    """get betting odds for specified teams"""
+    with tool_deadline():
+        fixtures = await get_fixtures_by_teams(team_1, team_2)
+
+        return await odds_tool_output(fixtures)
+
+def check_odds_by_teams_sync(team_1: str, team_2: str) -> Any:
     return asyncio.run(check_odds_by_teams(team_1, team_2))
 
-async def check_odds_by_date(date: str) -> List[Dict[str, Any]]:
+async def check_odds_by_date(date: str) -> Any:
     """get betting odds for specified date"""
-    fixtures = await get_fixtures_by_date(date)
-                    
-    return await get_odds(fixtures)
+    with tool_deadline():
+        fixtures = await get_fixtures_by_date(date)
+
+        return await odds_tool_output(fixtures)
 
-def check_odds_by_date_sync(date: str) -> List[Dict[str, Any]]:
+def check_odds_by_date_sync(date: str) -> Any:
     return asyncio.run(check_odds_by_date(date))
 
-async def check_odds_by_dates(date_1: str, date_2: str) -> List[Dict[str, Any]]:
+async def check_odds_by_dates(date_1: str, date_2: str) -> Any:
     """get betting odds within specified date range"""
-    fixtures = await get_fixtures_by_dates(date_1, date_2)
-    
-    if not fixtures:
-        print("No fixtures found for the given dates.")
-        return []
-                        
-    return await get_odds(fixtures)
+    with tool_deadline():
+        fixtures = await get_fixtures_by_dates(date_1, date_2)
+
+        return await odds_tool_output(fixtures)
 
-def check_odds_by_dates_sync(date_1: str, date_2: str) -> List[Dict[str, Any]]:
+def check_odds_by_dates_sync(date_1: str, date_2: str) -> Any:
     return asyncio.run(check_odds_by_dates(date_1, date_2))
 
 async def _initialize_tools():
@@ -0,0 +1,132 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+_MISSING = object()
+
+
+class _LeaderGone(Exception):
+    """Set on an in-flight load whose caller was cancelled before it finished."""
+
+
+class TTLCache:
+    """Process-wide LRU cache with per-entry expiry and single-flight loading.
+
+    Concurrent misses for the same key share one call to the loader, even when
+    they come from different threads or event loops.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def _lookup(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          refresh: bool = False, timeout: float | None = None) -> Any:
+        """Return the cached value for `key`, calling `loader` once on a miss.
+
+        With `refresh`, the loader runs even on a hit (background refreshes). A
+        caller waiting on another one's load gives up after `timeout` seconds with
+        asyncio.TimeoutError; the load itself keeps running.
+        """
+        if not refresh:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+
+            if leader:
+                break
+            try:
+                value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except _LeaderGone:
+                # The leading caller was cancelled; take over the load instead of failing with it.
+                continue
+            if not refresh:
+                self.hits += 1
+            return value
+
+        if not refresh:
+            self.misses += 1
+        try:
+            value = await loader()
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        except BaseException:
+            # Cancellation belongs to this caller only; waiting callers retry the load.
+            future.set_exception(_LeaderGone())
+            future.exception()
+            raise
+        else:
+            if self.ttl > 0:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -17,9 +17,48 @@ def thread_not_found():
     )
 
 
+def sport_not_found():
+    """Raises HTTPException for sport not found."""
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Sport not found"
+    )
+
+
 def user_for_thread_not_found():
     """Raises HTTPException for user associated with a thread not found."""
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail="User for this thread not found"
-    )
\ No newline at end of file
+    )
+
+
+def invalid_cursor():
+    """Raises HTTPException for a pagination cursor that cannot be decoded."""
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def invalid_fields(fields):
+    """Raises HTTPException for requested fields that cannot be selected."""
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown fields: {', '.join(fields)}"
+    )
+
+def invalid_filters(detail):
+    """Raises HTTPException for query filters that cannot be combined."""
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=detail
+    )
+
+
+def upstream_unavailable():
+    """Raises HTTPException when the sports API fails and nothing cached can be served."""
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Sports data is temporarily unavailable"
+    )
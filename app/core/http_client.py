@@ -0,0 +1,106 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# Read timeouts per upstream endpoint, in seconds.
+FIXTURES_TIMEOUT = float(os.getenv("FIXTURES_TIMEOUT", "30"))
+ODDS_TIMEOUT = float(os.getenv("ODDS_TIMEOUT", "30"))
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def endpoint_timeout(read_timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(read_timeout, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def _create_client(**client_kwargs) -> httpx.AsyncClient:
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("HTTP2_ENABLED is set but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=endpoint_timeout(FIXTURES_TIMEOUT),
+        headers={"accept": "application/json"},
+        **client_kwargs,
+    )
+
+
+async def start_http_client(**client_kwargs) -> httpx.AsyncClient:
+    """Create the application-wide pooled client. Called from the FastAPI lifespan.
+
+    Extra keyword arguments go to httpx.AsyncClient, e.g. a stub `transport` in load tests.
+    """
+    global _client, _client_loop
+    if _client is None:
+        _client = _create_client(**client_kwargs)
+        _client_loop = asyncio.get_running_loop()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+@asynccontextmanager
+async def upstream_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Yield the shared pooled client.
+
+    Connections are bound to the event loop that opened them, so callers running
+    on another loop (e.g. the synchronous tool wrappers) get a short-lived client.
+    """
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        yield _client
+        return
+
+    client = _create_client()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+def pool_stats() -> dict:
+    """Connection counts of the shared client, read from the httpcore pool."""
+    stats = {
+        "started": _client is not None,
+        "http2": HTTP2_ENABLED,
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+    }
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    stats["connections"] = len(connections)
+    stats["idle_connections"] = sum(1 for connection in connections if connection.is_idle())
+    stats["active_connections"] = stats["connections"] - stats["idle_connections"]
+    stats["queued_requests"] = sum(
+        1 for request in getattr(pool, "_requests", []) if getattr(request, "connection", None) is None
+    )
+    return stats
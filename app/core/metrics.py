@@ -0,0 +1,123 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import httpx
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.cache import TTLCache
+
+
+STAGE_SECONDS = Histogram(
+    "chatbet_stage_seconds", "Time spent per request stage", ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+UPSTREAM_REQUESTS = Counter(
+    "chatbet_upstream_requests_total", "Requests to the sports API", ["endpoint", "outcome"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "chatbet_upstream_request_seconds", "Latency of requests to the sports API", ["endpoint"],
+)
+ODDS_FANOUT = Histogram(
+    "chatbet_odds_fanout_fixtures", "Fixtures whose odds are requested per odds lookup",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+# Spans of the current request as [stage, seconds] pairs, read by the Server-Timing middleware.
+_request_spans: ContextVar[list | None] = ContextVar("request_spans", default=None)
+
+_caches: dict[str, TTLCache] = {}
+
+
+def register_cache(name: str, cache: TTLCache) -> TTLCache:
+    """Export the cache's hits, misses and size on /metrics."""
+    _caches[name] = cache
+    return cache
+
+
+class _CacheCollector:
+    def collect(self):
+        hits = CounterMetricFamily("chatbet_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("chatbet_cache_misses", "Cache misses", labels=["cache"])
+        size = GaugeMetricFamily("chatbet_cache_entries", "Entries held in the cache", labels=["cache"])
+        ratio = GaugeMetricFamily("chatbet_cache_hit_ratio", "Hits over lookups since start", labels=["cache"])
+        backend_errors = CounterMetricFamily("chatbet_cache_backend_errors",
+                                             "Shared cache backend failures served by loading directly",
+                                             labels=["cache"])
+        for name, cache in _caches.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+            ratio.add_metric([name], stats["hit_ratio"])
+            if "backend_errors" in stats:
+                backend_errors.add_metric([name], stats["backend_errors"])
+        return [hits, misses, size, ratio, backend_errors]
+
+
+REGISTRY.register(_CacheCollector())
+
+
+def start_request_spans() -> list:
+    spans = []
+    _request_spans.set(spans)
+    return spans
+
+
+def record_span(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def upstream_request(endpoint: str):
+    """Time one sports API request for /metrics and count it by outcome."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except (httpx.TimeoutException, asyncio.TimeoutError):
+        outcome = "timeout"
+        raise
+    except asyncio.CancelledError:
+        # The loser of a hedged pair, or a chat that went away.
+        outcome = "cancelled"
+        raise
+    except httpx.HTTPStatusError:
+        outcome = "http_error"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_REQUESTS.labels(endpoint, outcome).inc()
+        # Not a request span: concurrent requests would add up to more than the wall time,
+        # which the tool and odds_fanout spans already report.
+        UPSTREAM_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+
+
+def server_timing(spans: list) -> str:
+    """Server-Timing header value, one entry per stage with repeated spans summed."""
+    totals: dict[str, list] = {}
+    for stage, seconds in spans:
+        total = totals.setdefault(stage, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+    return ", ".join(
+        f'{stage};dur={seconds * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+        for stage, (seconds, count) in totals.items()
+    )
@@ -0,0 +1,31 @@
+import base64
+import json
+
+from app.core.error_manager import invalid_cursor, invalid_fields
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque keyset cursor holding the sort key of the last returned row."""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        invalid_cursor()
+    if not isinstance(values, list) or len(values) != size:
+        invalid_cursor()
+    return values
+
+
+def parse_fields(fields: str | None, allowed: dict, default: list[str]) -> list[str]:
+    """Split a comma separated `fields` query parameter and check it against `allowed`."""
+    if not fields:
+        return default
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        invalid_fields(unknown)
+    return requested
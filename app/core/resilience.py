@@ -0,0 +1,279 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge
+
+from app.core.metrics import upstream_request
+
+load_dotenv()
+
+# Seconds one tool call may spend on upstream requests, retries included.
+UPSTREAM_TOOL_BUDGET = float(os.getenv("UPSTREAM_TOOL_BUDGET", "10"))
+# Extra attempts for failed idempotent GETs, with full-jitter exponential backoff.
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "1"))
+# Send a second copy of a request still running after the endpoint's p95 latency.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# Consecutive failures that open an endpoint's circuit, and seconds before it lets a probe through.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+UPSTREAM_RETRIES = Counter("chatbet_upstream_retries_total", "Retried sports API requests", ["endpoint"])
+UPSTREAM_HEDGES = Counter("chatbet_upstream_hedges_total", "Hedged sports API requests", ["endpoint"])
+UPSTREAM_FALLBACKS = Counter(
+    "chatbet_upstream_fallbacks_total", "Failed sports API lookups by what was served instead",
+    ["endpoint", "served"],
+)
+CIRCUIT_OPEN = Gauge("chatbet_circuit_open", "1 while the endpoint's circuit is open", ["endpoint"])
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """The endpoint failed too often recently; requests are not sent until it recovers."""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The tool budget ran out before the request could be sent."""
+
+
+# Failures after which callers fall back to cached data.
+UPSTREAM_ERRORS = (httpx.HTTPError, asyncio.TimeoutError, CircuitOpenError)
+
+_deadline: ContextVar[float | None] = ContextVar("upstream_deadline", default=None)
+
+
+@contextmanager
+def tool_deadline(budget: float = UPSTREAM_TOOL_BUDGET):
+    """Bound upstream calls made inside the block to `budget` seconds; nested scopes keep the earlier deadline."""
+    deadline = time.monotonic() + budget
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time(default: float) -> float:
+    """Seconds left before the current deadline, at most `default`."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return min(default, deadline - time.monotonic())
+
+
+def remaining_timeout() -> float | None:
+    """Seconds left before the current deadline as an asyncio.wait_for timeout; None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one probe through every reset_timeout."""
+
+    def __init__(self, endpoint: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed, e.g. one cancelled or out of budget."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+        CIRCUIT_OPEN.labels(self.endpoint).set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+            opened = self.opened_at is not None
+        CIRCUIT_OPEN.labels(self.endpoint).set(1 if opened else 0)
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class LatencyWindow:
+    """Recent successful request latencies of one endpoint."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def p95(self) -> float | None:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_latencies: dict[str, LatencyWindow] = {}
+
+
+def breaker(endpoint: str) -> CircuitBreaker:
+    if endpoint not in _breakers:
+        _breakers[endpoint] = CircuitBreaker(endpoint)
+    return _breakers[endpoint]
+
+
+def _latency(endpoint: str) -> LatencyWindow:
+    if endpoint not in _latencies:
+        _latencies[endpoint] = LatencyWindow()
+    return _latencies[endpoint]
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)) and not isinstance(exc, DeadlineExceeded)
+
+
+def _outcome(exc: BaseException) -> str | None:
+    """How a failed call counts for the breaker: only an unhealthy endpoint is a failure."""
+    if _retryable(exc):
+        return "failure"
+    if isinstance(exc, httpx.HTTPStatusError):
+        # The endpoint answered; a 4xx is about this request, not its health.
+        return "success"
+    # Running out of budget, or an error of our own, says nothing about the endpoint.
+    return None
+
+
+async def _attempt(endpoint: str, attempt: Callable[[float], Awaitable[T]], timeout: float) -> T:
+    seconds = remaining_time(timeout)
+    if seconds <= 0:
+        raise DeadlineExceeded(f"no time left for {endpoint}")
+    started = time.monotonic()
+    with upstream_request(endpoint):
+        result = await asyncio.wait_for(attempt(seconds), seconds)
+    _latency(endpoint).add(time.monotonic() - started)
+    return result
+
+
+async def _hedged(endpoint: str, attempt: Callable[[float], Awaitable[T]], timeout: float) -> T:
+    delay = _latency(endpoint).p95()
+    first = asyncio.ensure_future(_attempt(endpoint, attempt, timeout))
+    if delay is None:
+        return await first
+
+    pending = {first}
+    try:
+        # Whatever is still pending when this returns, raises or is cancelled gets cancelled.
+        done, pending = await asyncio.wait(pending, timeout=max(delay, HEDGE_MIN_DELAY))
+        if done:
+            return first.result()
+
+        UPSTREAM_HEDGES.labels(endpoint).inc()
+        pending.add(asyncio.ensure_future(_attempt(endpoint, attempt, timeout)))
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_upstream(endpoint: str, attempt: Callable[[float], Awaitable[T]], timeout: float,
+                        hedge: bool = False) -> T:
+    """Run `attempt(seconds)`, an idempotent request, with the endpoint's resilience policy.
+
+    Each try is bounded by `timeout` and the current tool_deadline. Timeouts,
+    transport errors, 429 and 5xx are retried with jittered backoff, the
+    endpoint's circuit breaker short-circuits while it is open, and with `hedge`
+    a slow try gets a parallel duplicate after the endpoint's p95 latency.
+    """
+    circuit = breaker(endpoint)
+    if not circuit.allow():
+        raise CircuitOpenError(f"{endpoint} circuit is open")
+
+    outcome = None
+    try:
+        for retry in range(RETRY_ATTEMPTS + 1):
+            try:
+                if hedge and HEDGE_ENABLED:
+                    result = await _hedged(endpoint, attempt, timeout)
+                else:
+                    result = await _attempt(endpoint, attempt, timeout)
+            except Exception as exc:
+                backoff = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** retry))
+                # Never sleep into the deadline: the next try would have no time left anyway.
+                if _retryable(exc) and retry < RETRY_ATTEMPTS and remaining_time(backoff + 1) > backoff:
+                    UPSTREAM_RETRIES.labels(endpoint).inc()
+                    await asyncio.sleep(backoff)
+                    continue
+                outcome = _outcome(exc)
+                raise
+            outcome = "success"
+            return result
+    finally:
+        if outcome == "success":
+            circuit.record_success()
+        elif outcome == "failure":
+            circuit.record_failure()
+        else:
+            circuit.release()
+
+
+def record_fallback(endpoint: str, served: str) -> None:
+    UPSTREAM_FALLBACKS.labels(endpoint, served).inc()
+
+
+def upstream_stats() -> dict:
+    return {
+        endpoint: {**circuit.stats(), "p95_seconds": _latency(endpoint).p95()}
+        for endpoint, circuit in _breakers.items()
+    }
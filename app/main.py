@@ -1,37 +1,195 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import uvicorn
-from app.chat.services import initiate_chat_service, initiate_thread_service, get_users_service
+from app.chat.agent import build_agent, build_llm
+from app.chat.answer_cache import ANSWER_CACHE_ENABLED, answer_cache
+from app.chat.cache_backend import CACHE_BACKEND, cache_purger
+from app.chat.checkpointer import open_checkpointer
+from app.chat.history_writer import HISTORY_DURABILITY, history_writer
+from app.chat.memory import MEMORY_MODE, SUMMARY_MODEL, summarizer
+from app.chat.prefetch import PREFETCH_ENABLED, prefetch_scheduler
+from app.chat.services import (
+    get_fixtures_service,
+    get_odds_service,
+    get_thread_history_service,
+    get_users_service,
+    initiate_chat_service,
+    initiate_thread_service,
+    stream_chat_service,
+)
 from app.chat.schemas import Message
+from app.core.http_client import close_http_client, pool_stats, start_http_client
+from app.core.metrics import server_timing, span, start_request_spans
+from app.core.resilience import upstream_stats as resilience_stats
+
+
+from .database import engine, get_db
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncExitStack() as stack:
+        await start_http_client()
+        stack.push_async_callback(engine.dispose)
+        stack.push_async_callback(close_http_client)
+
+        if HISTORY_DURABILITY == "batched":
+            history_writer.start()
+            # Registered after engine.dispose, so queued rows are flushed before it runs.
+            stack.push_async_callback(history_writer.stop)
+
+        checkpointer = await stack.enter_async_context(open_checkpointer())
+        agent_executor = await build_agent(checkpointer)
 
+        if MEMORY_MODE == "summary":
+            summarizer.start(agent_executor, build_llm(SUMMARY_MODEL))
+            stack.push_async_callback(summarizer.stop)
+
+        if PREFETCH_ENABLED:
+            prefetch_scheduler.start()
+            stack.push_async_callback(prefetch_scheduler.stop)
+
+        if CACHE_BACKEND == "database":
+            cache_purger.start()
+            stack.push_async_callback(cache_purger.stop)
+        yield
 
-from .database import get_db
 
 app = FastAPI(
     title="ChatBet API",
     description="API for managing bets and chat interactions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Report the stages timed while handling the request in a Server-Timing header."""
+    spans = start_request_spans()
+    with span("total"):
+        response = await call_next(request)
+    # Streaming bodies run after the headers are sent, so only stages up to then are listed.
+    response.headers["Server-Timing"] = server_timing(spans)
+    return response
+
+
 @app.get("/")
 async def root():
     return {"message": "CHATBET API IS RUNNING"}
 
 @app.post("/initiate_thread/{user_id}")
-async def initiate_thread(user_id, db=Depends(get_db)):
+async def initiate_thread(user_id: int, db=Depends(get_db)):
     return await initiate_thread_service(user_id, db)
 
-@app.get("/get_users/")
-async def get_users(db=Depends(get_db)):
-    return await get_users_service(db)
+def _page_response(page: dict, if_none_match: str | None, cache_control: str) -> Response:
+    """Send a rendered page, or 304 when the client already holds its ETag."""
+    headers = {"ETag": page["etag"], "Cache-Control": cache_control}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if if_none_match and page["etag"] in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page["content"], media_type="application/json", headers=headers)
+
+@app.get("/get_users/", response_class=ORJSONResponse)
+async def get_users(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma separated: id, name, sport_id, sport_name"),
+    if_none_match: str | None = Header(None),
+    db=Depends(get_db),
+):
+    page = await get_users_service(db, limit, cursor, fields)
+    return _page_response(page, if_none_match, "no-cache")
+
+@app.get("/fixtures", response_class=ORJSONResponse)
+async def get_fixtures(
+    sport_id: int,
+    team: list[str] = Query([], description="one team, or two for the fixtures between them"),
+    on: date | None = Query(None, alias="date"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma separated: id, tournament_id, start_time, home_team, away_team"),
+    if_none_match: str | None = Header(None),
+    db=Depends(get_db),
+):
+    page = await get_fixtures_service(sport_id, db, team, on, date_from, date_to, limit, cursor, fields)
+    return _page_response(page, if_none_match, page["cache_control"])
+
+@app.get("/odds", response_class=ORJSONResponse)
+async def get_odds(
+    sport_id: int,
+    fixture_ids: str | None = Query(None, description="comma separated fixture ids, instead of the filters"),
+    team: list[str] = Query([], description="one team, or two for the fixtures between them"),
+    on: date | None = Query(None, alias="date"),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma separated: id, tournament_id, start_time, home_team, away_team, odds"),
+    if_none_match: str | None = Header(None),
+    db=Depends(get_db),
+):
+    page = await get_odds_service(sport_id, db, fixture_ids, team, on, date_from, date_to, limit, cursor, fields)
+    return _page_response(page, if_none_match, page["cache_control"])
 
 @app.post("/initiate_chat/{thread_id}")
-async def initiate_chat(thread_id, schema: Message, db=Depends(get_db)):
+async def initiate_chat(thread_id: int, schema: Message, db=Depends(get_db)):
     data = schema.model_dump()
     query = data.get("query")
     return await initiate_chat_service(query, thread_id, db)
 
+@app.post("/initiate_chat/{thread_id}/stream")
+async def initiate_chat_stream(thread_id: int, schema: Message, db=Depends(get_db)):
+    data = schema.model_dump()
+    query = data.get("query")
+    events = await stream_chat_service(query, thread_id, db)
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+@app.get("/threads/{thread_id}/history")
+async def get_thread_history(
+    thread_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="comma separated columns, e.g. input_message,output_message"),
+    db=Depends(get_db),
+):
+    return await get_thread_history_service(thread_id, db, limit, cursor, fields)
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/http_pool_stats/")
+async def http_pool_stats():
+    return pool_stats()
+
+@app.get("/upstream_stats/")
+async def upstream_stats():
+    return resilience_stats()
+
+@app.get("/history_writer_stats/")
+async def history_writer_stats():
+    return history_writer.stats()
+
+@app.get("/prefetch_stats/")
+async def prefetch_stats():
+    return prefetch_scheduler.stats()
+
+@app.get("/memory_stats/")
+async def memory_stats():
+    return summarizer.stats()
+
+@app.get("/answer_cache_stats/")
+async def answer_cache_stats():
+    return {"enabled": ANSWER_CACHE_ENABLED, **answer_cache.stats()}
+
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
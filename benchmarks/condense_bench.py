@@ -0,0 +1,164 @@
+"""Microbenchmark of the single-pass condense_betting_json against the original
+two-pass implementation (kept below as the reference).
+
+Reports CPU time per payload and peak allocations for each implementation and
+checks that both produce the same output.
+
+Usage:
+    python -m benchmarks.condense_bench                        # synthetic payloads
+    python -m benchmarks.condense_bench recorded/odds_*.json   # recorded /sports/odds bodies
+    python -m benchmarks.condense_bench --markets 1x2,over_under --fields name,odds
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from app.chat.odds import MARKETS, condense_betting_json
+
+
+def legacy_condense_betting_json(data):
+    """
+    Condense betting JSON by removing null values and redundant structures.
+    """
+    
+    def remove_nulls_and_redundant(obj):
+        """Remove null values and redundant structures"""
+        if isinstance(obj, dict):
+            result = {}
+            for key, value in obj.items():
+                if value is not None:
+                    cleaned_value = remove_nulls_and_redundant(value)
+                    if cleaned_value is not None and cleaned_value != {}:
+                        result[key] = cleaned_value
+            return result if result else None
+        elif isinstance(obj, list):
+            result = [remove_nulls_and_redundant(item) for item in obj if item is not None]
+            return [item for item in result if item is not None and item != {}]
+        else:
+            return obj
+    
+    def simplify_bet_structure(bet_data):
+        """Simplify bet structure to essential fields"""
+        if not isinstance(bet_data, dict):
+            return bet_data
+            
+        simplified = {}
+        for key, value in bet_data.items():
+            if isinstance(value, dict) and 'name' in value and 'odds' in value:
+                # if profit equals odds, we can omit profit
+                if value.get('profit') == value.get('odds'):
+                    simplified[key] = {
+                        'name': value['name'],
+                        'odds': value['odds'],
+                        'betId': value['betId']
+                    }
+                else:
+                    simplified[key] = value
+            else:
+                simplified[key] = simplify_bet_structure(value)
+        
+        return simplified
+    
+    # Clean null values
+    cleaned = remove_nulls_and_redundant(data)
+    
+    # Simplify bet structure
+    condensed = simplify_bet_structure(cleaned)
+    
+    return condensed
+
+
+def synthetic_odds_payload(markets: int = 40, lines: int = 8, seed: int = 0) -> dict:
+    """An odds body shaped like /sports/odds: many markets and lines, lots of nulls."""
+    rng = random.Random(seed)
+
+    def selection(name: str) -> dict:
+        odds = round(rng.uniform(1.05, 12.0), 2)
+        return {
+            "name": name,
+            "odds": odds,
+            "profit": odds if rng.random() < 0.8 else round(odds * 0.95, 2),
+            "betId": f"{rng.getrandbits(48):x}",
+            "status": None,
+            "limit": None,
+            "meta": {"suspended": None, "updated": None},
+        }
+
+    market_names = list(MARKETS) + [f"market_{i}" for i in range(max(0, markets - len(MARKETS)))]
+    payload = {
+        "fixtureId": rng.randint(1, 10**6),
+        "tournament": {"id": rng.randint(1, 500), "name": "League", "country": None},
+        "result": None,
+        "extra": {"live": None, "stream": None},
+        "tags": [None, "pre_match", {}],
+    }
+    for name in market_names[:markets]:
+        payload[name] = {
+            f"line_{line / 2}": {
+                "home": selection("home"),
+                "draw": selection("draw") if rng.random() < 0.5 else None,
+                "away": selection("away"),
+                "closed": None,
+            }
+            for line in range(lines)
+        }
+    return payload
+
+
+def measure(func: Callable[[Any], Any], payloads: list, repeat: int) -> tuple[float, int]:
+    """CPU seconds per payload and peak traced bytes for one pass over all payloads."""
+    started = time.process_time()
+    for _ in range(repeat):
+        for payload in payloads:
+            func(payload)
+    cpu = (time.process_time() - started) / (repeat * len(payloads))
+
+    tracemalloc.start()
+    for payload in payloads:
+        func(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", nargs="*", help="recorded /sports/odds JSON bodies")
+    parser.add_argument("--count", type=int, default=50, help="synthetic payloads when none are given")
+    parser.add_argument("--markets", help="comma separated market allow-list for the new condenser")
+    parser.add_argument("--fields", help="comma separated selection fields for the new condenser")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.payloads:
+        payloads = []
+        for path in args.payloads:
+            with open(path) as f:
+                payloads.append(json.load(f))
+    else:
+        payloads = [synthetic_odds_payload(seed=seed) for seed in range(args.count)]
+
+    markets = args.markets.split(",") if args.markets else None
+    fields = args.fields.split(",") if args.fields else None
+
+    def single_pass(payload):
+        return condense_betting_json(payload, markets=markets, fields=fields)
+
+    if markets is None and fields is None:
+        mismatches = sum(legacy_condense_betting_json(p) != condense_betting_json(p, None, None) for p in payloads)
+        print(f"payloads={len(payloads)} output_mismatches={mismatches}")
+
+    size = sum(len(json.dumps(p)) for p in payloads) / len(payloads)
+    print(f"average payload size: {size / 1024:.1f} KiB")
+    for name, func in (("two-pass (original)", legacy_condense_betting_json), ("single-pass", single_pass)):
+        cpu, peak = measure(func, payloads, args.repeat)
+        out = sum(len(json.dumps(func(p))) for p in payloads) / len(payloads)
+        print(f"{name:20} cpu={cpu * 1000:8.3f} ms/payload  peak_alloc={peak / 1024:9.1f} KiB  "
+              f"output={out / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Mixed-sport load against the chat tools to check that concurrent chats never
+see each other's sport.
+
+Each simulated chat runs in its own task with its own user context and calls
+the fixture and odds tools against an in-process stub of the query API.
+
+Usage:
+    python -m benchmarks.crosstalk --chats 500 --sports 1,2,3,6 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import httpx
+
+from app.chat import tools
+from app.chat.context import UserContext, current_user
+from app.core.http_client import close_http_client, start_http_client
+
+
+def _stub_transport(latency: float, fixtures_per_sport: int) -> httpx.MockTransport:
+    start_time = datetime.now().strftime("%m-%d 12:00")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(random.uniform(0, latency))
+        sport_id = int(request.url.params["sportId"])
+        if request.url.path.endswith("/sports/sports-fixtures"):
+            return httpx.Response(200, json=[
+                {
+                    "id": sport_id * 100000 + i,
+                    "sport_id": sport_id,
+                    "tournament_id": 1,
+                    "startTime": start_time,
+                    "home_team_data": {"name": {"en": f"Home {sport_id}-{i}"}},
+                    "away_team_data": {"name": {"en": f"Away {sport_id}-{i}"}},
+                }
+                for i in range(fixtures_per_sport)
+            ])
+        return httpx.Response(200, json={
+            "sportId": sport_id,
+            "fixtureId": int(request.url.params["fixtureId"]),
+            "1x2": {"home": {"name": "1", "odds": 2.1, "profit": 2.1, "betId": "a"}},
+        })
+
+    return httpx.MockTransport(handler)
+
+
+async def _chat(sport_id: int, date: str) -> int:
+    current_user.set(UserContext(user_id=sport_id, sport_id=sport_id))
+    await asyncio.sleep(0)
+
+    fixtures = await tools.get_fixtures_by_date(date)
+    odds = await tools.check_odds_by_date(date)
+
+    return (sum(1 for fixture in fixtures if fixture["sport_id"] != sport_id)
+            + sum(1 for odd in odds if odd["sportId"] != sport_id))
+
+
+async def main(chats: int, sports: list[int], latency: float, fixtures_per_sport: int) -> int:
+    tools.QUERY_API_URL = tools.QUERY_API_URL or "http://query-api.stub"
+    await start_http_client(transport=_stub_transport(latency, fixtures_per_sport))
+    date = datetime.now().strftime("%Y-%m-%d")
+
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(
+            asyncio.create_task(_chat(random.choice(sports), date)) for _ in range(chats)
+        ))
+    finally:
+        await close_http_client()
+    elapsed = time.perf_counter() - started
+
+    leaked = sum(results)
+    print(f"chats={chats} sports={sports} elapsed={elapsed:.2f}s "
+          f"throughput={chats / elapsed:.1f} chats/s cross_talk_items={leaked}")
+    return leaked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--sports", default="1,2,3,6")
+    parser.add_argument("--latency", type=float, default=0.05, help="max stub latency in seconds")
+    parser.add_argument("--fixtures", type=int, default=20, help="fixtures per sport in the stub feed")
+    args = parser.parse_args()
+
+    leaked = asyncio.run(main(args.chats, [int(s) for s in args.sports.split(",")], args.latency, args.fixtures))
+    raise SystemExit(1 if leaked else 0)
@@ -0,0 +1,73 @@
+"""Deterministic chat model that replays scripted tool calls, so the real
+create_react_agent graph, tools and checkpointer run without Gemini.
+
+The latest user message picks the script: "<team> vs <team>" checks odds for
+those teams, "today", "tomorrow" and "week" check odds for those dates, and
+anything else is answered without tools. After a tool result the model answers
+with a short summary of it.
+
+Point the app at it with:
+    LLM_FACTORY=benchmarks.fake_llm:create_llm
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def _scripted_call(query: str) -> tuple[str, dict] | None:
+    today = datetime.now()
+    teams = re.search(r"(team \d+)\s+vs\.?\s+(team \d+)", query, re.IGNORECASE)
+    if teams:
+        return "check_odds_by_teams", {"team_1": teams.group(1), "team_2": teams.group(2)}
+    if "tomorrow" in query.lower():
+        return "check_odds_by_date", {"date": (today + timedelta(days=1)).strftime("%Y-%m-%d")}
+    if "today" in query.lower():
+        return "check_odds_by_date", {"date": today.strftime("%Y-%m-%d")}
+    if "week" in query.lower():
+        return "check_odds_by_dates", {"date_1": today.strftime("%Y-%m-%d"),
+                                       "date_2": (today + timedelta(days=6)).strftime("%Y-%m-%d")}
+    return None
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model whose replies depend only on the conversation, never on randomness."""
+
+    # Seconds each call waits, standing in for model latency.
+    think_time: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _reply(self, messages: list) -> AIMessage:
+        last = messages[-1]
+        query = next((message.content for message in reversed(messages) if isinstance(message, HumanMessage)), "")
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Checked {last.name}: {len(str(last.content))} characters of data for '{query}'.")
+        call = _scripted_call(str(query))
+        if call is None:
+            return AIMessage(content=f"Scripted answer to '{query}'.")
+        name, args = call
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{len(messages)}"}])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.think_time:
+            await asyncio.sleep(self.think_time)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def create_llm(model: str | None = None) -> ScriptedChatModel:
+    """LLM_FACTORY hook; FAKE_LLM_THINK_TIME sets the simulated latency."""
+    return ScriptedChatModel(think_time=float(os.getenv("FAKE_LLM_THINK_TIME", "0")))
@@ -0,0 +1,76 @@
+"""Peak memory of parsing the fixtures feed whole versus incrementally.
+
+Serves a synthetic /sports/sports-fixtures body of growing size through an
+in-memory transport and measures tracemalloc peaks for response.json() plus a
+filter, and for the streamed iter_fixtures() path with a predicate.
+
+Usage:
+    python -m benchmarks.feed_parse_bench --sizes 1000 10000 50000
+"""
+import argparse
+import asyncio
+import json
+import tracemalloc
+
+import httpx
+
+from app.chat.fixture_feed import iter_fixtures, project_fixture
+from app.chat.fixture_index import involves_teams
+
+FIELDS = ("id", "tournament_id", "startTime", "home_team_data.name.en", "away_team_data.name.en")
+
+
+def synthetic_feed(size: int) -> bytes:
+    return json.dumps([
+        {
+            "id": i,
+            "tournament_id": i % 300,
+            "startTime": f"{1 + i % 12:02d}-{1 + i % 28:02d} 18:00",
+            "home_team_data": {"name": {"en": f"Team {i % 500}", "es": f"Equipo {i % 500}"}, "logo": "x" * 64},
+            "away_team_data": {"name": {"en": f"Team {(i + 7) % 500}", "es": f"Equipo {(i + 7) % 500}"}, "logo": "x" * 64},
+            "tournament_data": {"name": {"en": "League"}, "country": "Somewhere", "extra": [None] * 10},
+        }
+        for i in range(size)
+    ]).encode()
+
+
+async def whole(client: httpx.AsyncClient, team: str) -> list:
+    response = await client.get("http://stub/sports/sports-fixtures")
+    predicate = involves_teams(team)
+    return [fixture for fixture in response.json() if predicate(fixture)]
+
+
+async def streamed(client: httpx.AsyncClient, team: str) -> list:
+    predicate = involves_teams(team)
+    async with client.stream("GET", "http://stub/sports/sports-fixtures") as response:
+        return [project_fixture(fixture, FIELDS) async for fixture in iter_fixtures(response) if predicate(fixture)]
+
+
+async def measure(parse, body: bytes) -> tuple[int, int]:
+    async def chunks():
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=chunks()))
+    async with httpx.AsyncClient(transport=transport) as client:
+        tracemalloc.start()
+        selected = await parse(client, "Team 42")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return len(selected), peak
+
+
+async def main(sizes: list[int]) -> None:
+    for size in sizes:
+        body = synthetic_feed(size)
+        for name, parse in (("response.json()", whole), ("iter_fixtures()", streamed)):
+            selected, peak = await measure(parse, body)
+            print(f"fixtures={size:>7} body={len(body) / 2**20:7.1f} MiB  {name:16} "
+                  f"selected={selected:>4} peak={peak / 2**20:8.2f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
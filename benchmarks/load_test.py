@@ -0,0 +1,173 @@
+"""Load generator for /initiate_thread and /initiate_chat.
+
+Each virtual user opens a thread and sends --turns chat messages; --concurrency
+users run at a time until --sessions sessions are done. Reports throughput,
+p50/p95/p99 latency per endpoint and the mean of each Server-Timing stage.
+
+Without --base-url everything runs offline in this process: the stub query API
+(benchmarks.stub_upstream) on a local port, the app with the scripted model
+(benchmarks.fake_llm) through the real agent graph, and a SQLite database
+unless DATABASE_URL is set.
+
+Usage:
+    python -m benchmarks.load_test --sessions 200 --concurrency 20 --turns 2
+    python -m benchmarks.load_test --base-url http://localhost:8000 --user-ids 1,2,3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from itertools import cycle
+
+import httpx
+
+QUERIES = [
+    "Which team has the best odds tomorrow?",
+    "Give me a recommendation for today",
+    "What are the odds for Team 1 vs Team 8?",
+    "Any good bets this week?",
+    "Hello!",
+]
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.stages: dict[str, list[float]] = {}
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return None
+        finally:
+            self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        for entry in response.headers.get("server-timing", "").split(","):
+            stage, _, params = entry.strip().partition(";")
+            for param in params.split(";"):
+                if param.startswith("dur="):
+                    self.stages.setdefault(stage, []).append(float(param[4:]))
+        return response
+
+    def report(self, elapsed: float) -> None:
+        print(f"{'endpoint':16} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8}")
+        for name, values in self.latencies.items():
+            ms = sorted(value * 1000 for value in values)
+            print(f"{name:16} {len(ms):8d} {self.errors.get(name, 0):6d} {len(ms) / elapsed:8.1f} "
+                  f"{percentile(ms, 50):8.1f} {percentile(ms, 95):8.1f} {percentile(ms, 99):8.1f} {ms[-1]:8.1f}")
+        if self.stages:
+            print("\nServer-Timing stage means per response (ms, repeated spans summed):")
+            for stage, values in sorted(self.stages.items(), key=lambda item: -statistics.fmean(item[1])):
+                print(f"  {stage:32} {statistics.fmean(values):9.1f}  (n={len(values)})")
+
+
+async def session(client: httpx.AsyncClient, recorder: Recorder, user_id: int, queries, turns: int) -> None:
+    response = await recorder.request(client, "initiate_thread", "POST", f"/initiate_thread/{user_id}")
+    if response is None:
+        return
+    thread_id = response.json()["thread_id"]
+    for _ in range(turns):
+        await recorder.request(client, "initiate_chat", "POST", f"/initiate_chat/{thread_id}",
+                               json={"query": next(queries)})
+
+
+async def run(client: httpx.AsyncClient, user_ids: list[int], sessions: int, concurrency: int,
+              turns: int) -> None:
+    recorder = Recorder()
+    queries = cycle(QUERIES)
+    users = cycle(user_ids)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await session(client, recorder, next(users), queries, turns)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(sessions)))
+    elapsed = time.perf_counter() - started
+    print(f"sessions={sessions} concurrency={concurrency} turns={turns} elapsed={elapsed:.2f}s\n")
+    recorder.report(elapsed)
+
+
+@asynccontextmanager
+async def offline_app(args):
+    """Stub query API on a local port plus the app in-process, wired to each other."""
+    import uvicorn
+    from benchmarks.stub_upstream import create_stub_app
+
+    stub = uvicorn.Server(uvicorn.Config(
+        create_stub_app(args.fixtures, args.latency, error_rate=args.error_rate),
+        host="127.0.0.1", port=args.stub_port, log_level="warning",
+    ))
+    stub_task = asyncio.create_task(stub.serve())
+    while not stub.started:
+        await asyncio.sleep(0.05)
+
+    # Settings are read at import time, so set them before the app is imported.
+    os.environ["QUERY_API_URL"] = f"http://127.0.0.1:{args.stub_port}"
+    os.environ["LLM_FACTORY"] = "benchmarks.fake_llm:create_llm"
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/load_test.db")
+    os.environ.setdefault("PREFETCH_ENABLED", "false")
+
+    from app.chat import models
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        if not await db.get(models.Sports, 1):
+            db.add(models.Sports(id=1, name="Football"))
+        for user_id in range(1, args.users + 1):
+            if not await db.get(models.Users, user_id):
+                db.add(models.Users(id=user_id, name=f"User {user_id}", sport_id=1))
+        await db.commit()
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as client:
+                yield client
+    finally:
+        stub.should_exit = True
+        await stub_task
+
+
+async def main(args) -> None:
+    if args.base_url:
+        user_ids = [int(user_id) for user_id in args.user_ids.split(",")]
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+            await run(client, user_ids, args.sessions, args.concurrency, args.turns)
+        return
+
+    async with offline_app(args) as client:
+        await run(client, list(range(1, args.users + 1)), args.sessions, args.concurrency, args.turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="running app to target; omitted runs everything offline")
+    parser.add_argument("--user-ids", default="1,2,3", help="existing users when --base-url is given")
+    parser.add_argument("--users", type=int, default=20, help="users seeded in offline mode")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=2, help="chat messages per thread")
+    parser.add_argument("--fixtures", type=int, default=500, help="stub feed size per sport")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub 503 responses")
+    parser.add_argument("--stub-port", type=int, default=9010)
+    asyncio.run(main(parser.parse_args()))
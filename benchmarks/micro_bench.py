@@ -0,0 +1,91 @@
+"""Microbenchmarks of the hot paths: fixture filters and index lookups,
+condense_betting_json, the odds table encoder and the odds analytics.
+
+Results can be saved and compared against a previous run, so regressions show
+up as a percentage per benchmark.
+
+Usage:
+    python -m benchmarks.micro_bench --fixtures 20000 --save baseline.json
+    python -m benchmarks.micro_bench --fixtures 20000 --compare baseline.json
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from app.chat.fixture_index import FixtureIndex, involves_teams, starts_between
+from app.chat.odds import condense_betting_json, encode_odds_table, flatten_odds
+from app.chat.odds_analytics import ANALYTICS_AVAILABLE, analyze_odds
+from benchmarks.condense_bench import synthetic_odds_payload
+from benchmarks.stub_upstream import synthetic_fixtures
+
+
+def benchmarks(fixture_count: int, odds_count: int) -> dict:
+    fixtures = synthetic_fixtures(1, fixture_count)
+    index = FixtureIndex(fixtures)
+    tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    by_team = involves_teams("Team 1")
+    by_date = starts_between(tomorrow, tomorrow + timedelta(days=1))
+
+    payloads = [synthetic_odds_payload(seed=seed) for seed in range(odds_count)]
+    condensed = [(fixture, condense_betting_json(payload)) for fixture, payload in zip(fixtures, payloads)]
+
+    results = {
+        "filter.involves_teams": lambda: [fixture for fixture in fixtures if by_team(fixture)],
+        "filter.starts_between": lambda: [fixture for fixture in fixtures if by_date(fixture)],
+        "index.build": lambda: FixtureIndex(fixtures),
+        "index.by_team_name": lambda: index.by_team_name("Team 1"),
+        "index.by_teams": lambda: index.by_teams("Team 1", "Team 8"),
+        "index.on_date": lambda: index.on_date(tomorrow),
+        "index.between": lambda: index.between(tomorrow, tomorrow + timedelta(days=3)),
+        "odds.condense_betting_json": lambda: [condense_betting_json(payload) for payload in payloads],
+        "odds.flatten_odds": lambda: flatten_odds(condensed),
+        "odds.encode_odds_table": lambda: encode_odds_table(condensed, 4000),
+    }
+    if ANALYTICS_AVAILABLE:
+        results["odds.analyze_odds"] = lambda: analyze_odds(condensed)
+    return results
+
+
+def measure(func, repeat: int, min_time: float = 0.2) -> float:
+    """Best seconds per call over `repeat` rounds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=int, default=5000, help="fixtures in the synthetic feed")
+    parser.add_argument("--odds", type=int, default=20, help="odds payloads per condense/encode call")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", dest="only", help="run benchmarks whose name contains this")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"fixtures={args.fixtures} odds_payloads={args.odds}")
+    for name, func in benchmarks(args.fixtures, args.odds).items():
+        if args.only and args.only not in name:
+            continue
+        seconds = measure(func, args.repeat)
+        results[name] = seconds
+        line = f"{name:30} {seconds * 1e6:12.1f} us/call"
+        if name in baseline:
+            line += f"  {(seconds / baseline[name] - 1) * 100:+7.1f}% vs baseline"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Compare the size of check_odds_by_* tool results in the JSON and table formats.
+
+The model context cost of a tool result is roughly its serialized length, so
+this prints characters and estimated tokens for a day of fixtures in both
+formats, plus the time spent encoding.
+
+Usage:
+    python -m benchmarks.odds_payload_bench --fixtures 60 --budget 4000
+"""
+import argparse
+import json
+import time
+
+from app.chat.odds import condense_betting_json, encode_odds_table, estimate_tokens
+from benchmarks.condense_bench import synthetic_odds_payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=int, default=60)
+    parser.add_argument("--budget", type=int, nargs="+", default=[2000, 4000, 8000])
+    args = parser.parse_args()
+
+    fixture_odds = [
+        ({"id": i, "startTime": "10-18 18:00",
+          "home_team_data": {"name": {"en": f"Home {i}"}},
+          "away_team_data": {"name": {"en": f"Away {i}"}}},
+         condense_betting_json(synthetic_odds_payload(markets=12, lines=3, seed=i)))
+        for i in range(args.fixtures)
+    ]
+
+    as_json = [odds for _, odds in fixture_odds]
+    print(f"{'json':>14}: {len(json.dumps(as_json)):>9} chars  ~{estimate_tokens(as_json):>7} tokens")
+
+    for budget in args.budget:
+        started = time.perf_counter()
+        table = encode_odds_table(fixture_odds, budget)
+        elapsed = time.perf_counter() - started
+        truncated = table.get("truncated", {}).get("rows", 0)
+        print(f"{f'table/{budget}':>14}: {len(json.dumps(table)):>9} chars  ~{estimate_tokens(table):>7} tokens  "
+              f"rows={len(table['rows'])} truncated_rows={truncated} encode={elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
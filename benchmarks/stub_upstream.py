@@ -0,0 +1,91 @@
+"""Local stand-in for the query API: /sports/sports-fixtures and /sports/odds
+serving synthetic feeds of configurable size, with artificial latency.
+
+Fixtures start over the next --days days so date lookups find them, and team
+names repeat ("Team 0" .. "Team N") so team lookups do too. Odds bodies have
+the shape used by benchmarks.condense_bench.
+
+Usage:
+    python -m benchmarks.stub_upstream --port 9000 --fixtures 2000 --latency 0.05
+    QUERY_API_URL=http://127.0.0.1:9000 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Query, Response
+
+from benchmarks.condense_bench import synthetic_odds_payload
+
+
+def synthetic_fixtures(sport_id: int, size: int, teams: int = 200, days: int = 7) -> list[dict]:
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    fixtures = []
+    for i in range(size):
+        start = now + timedelta(hours=1 + (i * 24 * days) // max(size, 1))
+        home, away = i % teams, (i * 7 + 1) % teams
+        fixtures.append({
+            "id": sport_id * 1_000_000 + i,
+            "sport_id": sport_id,
+            "tournament_id": i % 50,
+            "startTime": start.strftime("%m-%d %H:%M"),
+            "home_team_data": {"name": {"en": f"Team {home}", "es": f"Equipo {home}"}, "logo": None},
+            "away_team_data": {"name": {"en": f"Team {away}", "es": f"Equipo {away}"}, "logo": None},
+            "tournament_data": {"name": {"en": f"League {i % 50}"}, "country": None},
+        })
+    return fixtures
+
+
+def create_stub_app(fixtures: int = 500, latency: float = 0.05, jitter: float = 0.5,
+                    error_rate: float = 0.0, markets: int = 20, lines: int = 4, days: int = 7,
+                    seed: int = 0) -> FastAPI:
+    """Stub API; each response waits `latency` seconds give or take `jitter` of it."""
+    app = FastAPI(title="Query API stub")
+    rng = random.Random(seed)
+    feeds: dict[int, bytes] = {}
+
+    async def delay() -> bool:
+        await asyncio.sleep(max(0.0, latency * (1 + rng.uniform(-jitter, jitter))))
+        return rng.random() < error_rate
+
+    @app.get("/sports/sports-fixtures")
+    async def sports_fixtures(sportId: int = 1):
+        if await delay():
+            return Response(status_code=503)
+        if sportId not in feeds:
+            feeds[sportId] = json.dumps(synthetic_fixtures(sportId, fixtures, days=days)).encode()
+        return Response(content=feeds[sportId], media_type="application/json")
+
+    @app.get("/sports/odds")
+    async def sports_odds(sportId: int = 1, fixtureId: int = Query(...), tournamentId: int | None = None):
+        if await delay():
+            return Response(status_code=503)
+        payload = synthetic_odds_payload(markets, lines, seed=fixtureId)
+        payload.update(sportId=sportId, fixtureId=fixtureId)
+        return Response(content=json.dumps(payload), media_type="application/json")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--fixtures", type=int, default=500, help="fixtures per sport in the feed")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency spread as a fraction of it")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--markets", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=4)
+    args = parser.parse_args()
+
+    app = create_stub_app(args.fixtures, args.latency, args.jitter, args.error_rate, args.markets, args.lines)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()